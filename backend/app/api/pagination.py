@@ -0,0 +1,34 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def apply_keyset(query, created_at_column, id_column, cursor: str | None, limit: int | None):
+    """Order newest first and, when a cursor is given, resume strictly after it."""
+    if cursor:
+        query = query.filter(tuple_(created_at_column, id_column) < decode_cursor(cursor))
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit)
+
+
+def next_cursor(rows: list, limit: int | None) -> str | None:
+    if limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -1,23 +1,39 @@
 from datetime import datetime, timezone
 import secrets
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session, load_only
 
 from app.api.deps import get_current_user
+from app.api.pagination import NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 from app.core.catalog import is_valid_department, normalize_department
-from app.core.security import hash_password
+from app.core.security import UNUSABLE_PASSWORD_HASH, hash_password
 from app.db.session import get_db
 from app.models.account_deletion_request import AccountDeletionRequest
 from app.models.enums import AccountDeletionStatus, NotificationType, UserRole
-from app.models.notification import Notification
 from app.models.user import User
 from app.schemas.account_deletion import AccountDeletionRequestOut, AccountDeletionReviewRequest
 from app.schemas.admin import AdminUserOut, AssignRoleRequest, ResetPasswordRequest
 from app.schemas.common import MessageResponse
+from app.services.cache import USER_LISTS_PREFIX, get_json, invalidate_user_lists, set_json
+from app.services.notifications import insert_notifications
 
 router = APIRouter()
 DEPARTMENT_ROLES = {UserRole.academic_staff, UserRole.course_coordinator, UserRole.department_head, UserRole.dean}
+ADMIN_USERS_CACHE_KEY = f"{USER_LISTS_PREFIX}admin"
+ADMIN_USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.full_name,
+    User.role,
+    User.department,
+    User.is_verified,
+    User.is_active,
+    User.is_major_admin,
+    User.role_assignment_locked,
+    User.created_at,
+)
 
 
 def _require_ict_or_major_admin(current_user: User) -> None:
@@ -30,14 +46,52 @@ def _require_major_admin(current_user: User) -> None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Major admin access required")
 
 
+def _get_admin_target(db: Session, user_id: str) -> User:
+    user = (
+        db.query(User)
+        .options(load_only(User.id, User.is_major_admin, User.is_active))
+        .filter(User.id == user_id, User.is_deleted.is_(False))
+        .first()
+    )
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
+
+
+def _update_admin_target(db: Session, user_id: str, values: dict, major_admin_detail: str | None = None) -> None:
+    conditions = [User.id == user_id, User.is_deleted.is_(False)]
+    if major_admin_detail:
+        conditions.append(User.is_major_admin.is_(False))
+    if db.execute(update(User).where(*conditions).values(**values).returning(User.id)).first():
+        return
+    if major_admin_detail:
+        _get_admin_target(db, user_id)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=major_admin_detail)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+
 @router.get("/users", response_model=list[AdminUserOut])
 def list_users(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[AdminUserOut]:
     _require_ict_or_major_admin(current_user)
-    rows = db.query(User).filter(User.is_deleted.is_(False)).order_by(User.created_at.desc()).all()
-    return [AdminUserOut.model_validate(row) for row in rows]
+    cache_key = f"{ADMIN_USERS_CACHE_KEY}:{limit}:{offset}:{cursor}"
+    cached = get_json(cache_key)
+    if cached is None:
+        query = db.query(*ADMIN_USER_COLUMNS).filter(User.is_deleted.is_(False))
+        rows = apply_keyset(query, User.created_at, User.id, cursor, limit).offset(offset).all()
+        users = [AdminUserOut.model_construct(**row._mapping) for row in rows]
+        cached = {"items": [user.model_dump(mode="json") for user in users], "next_cursor": next_cursor(rows, limit)}
+        set_json(cache_key, cached)
+
+    if cached["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = cached["next_cursor"]
+    return cached["items"]
 
 
 @router.patch("/users/{user_id}/assign-role", response_model=MessageResponse)
@@ -52,25 +106,21 @@ def assign_user_role(
     if payload.role == UserRole.ict_admin and not current_user.is_major_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only major admin can assign ICT Admin role")
 
-    user = db.query(User).filter(User.id == user_id, User.is_deleted.is_(False)).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    if user.is_major_admin:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Major admin role cannot be changed")
-
     department = normalize_department(payload.department)
     if payload.role in DEPARTMENT_ROLES and not is_valid_department(department):
+        # A missing target (404) and the major admin (400) take precedence over the department error.
+        if _get_admin_target(db, user_id).is_major_admin:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Major admin role cannot be changed")
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="A valid department is required for this role")
 
-    if payload.role == UserRole.student:
-        user.role = UserRole.student
-        user.department = None
-    else:
-        user.role = payload.role
-        user.department = department if payload.role in DEPARTMENT_ROLES else None
-
+    _update_admin_target(
+        db,
+        user_id,
+        {"role": payload.role, "department": department if payload.role in DEPARTMENT_ROLES else None},
+        major_admin_detail="Major admin role cannot be changed",
+    )
     db.commit()
+    invalidate_user_lists()
     return MessageResponse(message=f"Role updated: {payload.role.value}")
 
 
@@ -83,13 +133,9 @@ def deactivate_user(
     _require_ict_or_major_admin(current_user)
     if user_id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot deactivate yourself")
-    user = db.query(User).filter(User.id == user_id, User.is_deleted.is_(False)).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if user.is_major_admin:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot deactivate major admin")
-    user.is_active = False
+    _update_admin_target(db, user_id, {"is_active": False}, major_admin_detail="Cannot deactivate major admin")
     db.commit()
+    invalidate_user_lists()
     return MessageResponse(message="User deactivated")
 
 
@@ -100,11 +146,9 @@ def activate_user(
     current_user: User = Depends(get_current_user),
 ) -> MessageResponse:
     _require_ict_or_major_admin(current_user)
-    user = db.query(User).filter(User.id == user_id, User.is_deleted.is_(False)).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    user.is_active = True
+    _update_admin_target(db, user_id, {"is_active": True})
     db.commit()
+    invalidate_user_lists()
     return MessageResponse(message="User activated")
 
 
@@ -118,14 +162,13 @@ def delete_user(
     if user_id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Major admin cannot delete itself")
 
-    user = db.query(User).filter(User.id == user_id, User.is_deleted.is_(False)).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user = _get_admin_target(db, user_id)
     if user.is_major_admin:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete major admin")
 
     db.delete(user)
     db.commit()
+    invalidate_user_lists()
     return MessageResponse(message="User deleted")
 
 
@@ -137,17 +180,18 @@ def reset_user_password(
     current_user: User = Depends(get_current_user),
 ) -> MessageResponse:
     _require_ict_or_major_admin(current_user)
-    user = db.query(User).filter(User.id == user_id, User.is_deleted.is_(False)).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    user.hashed_password = hash_password(payload.new_password)
+    _update_admin_target(db, user_id, {"hashed_password": hash_password(payload.new_password)})
     db.commit()
     return MessageResponse(message="Password reset successfully")
 
 
 @router.get("/account-deletion-requests", response_model=list[AccountDeletionRequestOut])
 def list_account_deletion_requests(
+    response: Response,
     status_filter: AccountDeletionStatus | None = Query(default=None, alias="status"),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[AccountDeletionRequestOut]:
@@ -155,7 +199,10 @@ def list_account_deletion_requests(
     query = db.query(AccountDeletionRequest)
     if status_filter:
         query = query.filter(AccountDeletionRequest.status == status_filter)
-    rows = query.order_by(AccountDeletionRequest.created_at.desc()).all()
+    rows = apply_keyset(query, AccountDeletionRequest.created_at, AccountDeletionRequest.id, cursor, limit).offset(offset).all()
+    cursor_out = next_cursor(rows, limit)
+    if cursor_out:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_out
     return [AccountDeletionRequestOut.model_validate(row) for row in rows]
 
 
@@ -177,36 +224,54 @@ def review_account_deletion_request(
     row.reviewed_at = datetime.now(timezone.utc)
     row.review_note = (payload.review_note or "").strip() or None
 
-    target_user = db.query(User).filter(User.id == row.requester_id).first()
-
     if payload.approve:
         row.status = AccountDeletionStatus.approved
-        if target_user and target_user.is_major_admin:
+        wiped = db.execute(
+            update(User)
+            .where(User.id == row.requester_id, User.is_major_admin.is_(False))
+            .values(
+                is_active=False,
+                is_verified=False,
+                is_deleted=True,
+                full_name="Deleted User",
+                department=None,
+                email=f"deleted-{row.requester_id[:8]}-{secrets.token_hex(3)}@pau.deleted",
+                hashed_password=UNUSABLE_PASSWORD_HASH,
+                email_notifications_enabled=False,
+                push_notifications_enabled=False,
+                high_priority_alerts_enabled=False,
+                weekly_digest_enabled=False,
+            )
+            .returning(User.id)
+        ).first()
+        if not wiped and db.query(User.id).filter(User.id == row.requester_id).first():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Major admin account cannot be deleted")
-        if target_user:
-            target_user.is_active = False
-            target_user.is_verified = False
-            target_user.is_deleted = True
-            target_user.full_name = "Deleted User"
-            target_user.department = None
-            target_user.email = f"deleted-{target_user.id[:8]}-{secrets.token_hex(3)}@pau.deleted"
-            target_user.hashed_password = hash_password(f"deleted-{secrets.token_hex(16)}")
-            target_user.email_notifications_enabled = False
-            target_user.push_notifications_enabled = False
-            target_user.high_priority_alerts_enabled = False
-            target_user.weekly_digest_enabled = False
         db.commit()
+        invalidate_user_lists()
         return MessageResponse(message="Deletion approved and account deleted")
 
     row.status = AccountDeletionStatus.rejected
-    if target_user and target_user.is_active and not target_user.is_deleted and target_user.push_notifications_enabled:
-        db.add(
-            Notification(
-                user_id=target_user.id,
-                title="Account deletion request rejected",
-                message="Your account deletion request was reviewed and rejected by ICT Admin.",
-                type=NotificationType.info,
-            )
+    notify_requester = (
+        db.query(User.id)
+        .filter(
+            User.id == row.requester_id,
+            User.is_active.is_(True),
+            User.is_deleted.is_(False),
+            User.push_notifications_enabled.is_(True),
+        )
+        .first()
+    )
+    if notify_requester:
+        insert_notifications(
+            db,
+            [
+                {
+                    "user_id": row.requester_id,
+                    "title": "Account deletion request rejected",
+                    "message": "Your account deletion request was reviewed and rejected by ICT Admin.",
+                    "type": NotificationType.info,
+                }
+            ],
         )
     db.commit()
     return MessageResponse(message="Deletion request rejected")
@@ -1,12 +1,13 @@
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from io import BytesIO, StringIO
 import csv
+import hashlib
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import Response, StreamingResponse
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
+from sqlalchemy import Date, cast, func
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
@@ -17,6 +18,9 @@ from app.models.user import User
 from app.schemas.analytics import AnalyticsResponse, ResolutionMetric
 
 router = APIRouter()
+ANALYTICS_CACHE_CONTROL = "private, max-age=30"
+PDF_TOP = 800
+PDF_BOTTOM = 80
 
 
 def _guard_analytics_access(current_user: User, department: str | None):
@@ -29,168 +33,256 @@ def _guard_analytics_access(current_user: User, department: str | None):
     raise HTTPException(status_code=403, detail="Analytics access is restricted")
 
 
-def _filtered_feedback(db: Session, current_user: User, department: str | None):
-    query = db.query(Feedback)
+def _scoped_query(db: Session, current_user: User, department: str | None, *entities):
+    query = db.query(*(entities or (Feedback,)))
     if current_user.role in {UserRole.department_head, UserRole.course_coordinator, UserRole.dean}:
         query = query.filter(Feedback.type == FeedbackType.academic, Feedback.department == current_user.department)
     elif department:
         query = query.filter(Feedback.department == department)
-    return query.all()
+    return query
 
 
-def _resolution_hours(feedbacks: list[Feedback]) -> ResolutionMetric:
-    deltas: list[float] = []
-    for item in feedbacks:
-        if item.status != FeedbackStatus.resolved:
-            continue
-        delta = item.updated_at - item.created_at
-        deltas.append(delta.total_seconds() / 3600)
-    if not deltas:
+def _hours_between(db: Session, start, end):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+
+def _day_bucket(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc("day", column), Date)
+    return func.date(column)
+
+
+def _day_index(day, start_date: date) -> int:
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return (day - start_date).days
+
+
+def _grouped_counts(query, column, limit: int | None = None) -> dict[str, int]:
+    count = func.count(Feedback.id)
+    grouped = query.with_entities(column, count).group_by(column).order_by(count.desc())
+    if limit is not None:
+        grouped = grouped.limit(limit)
+    return {getattr(key, "value", key): value for key, value in grouped}
+
+
+def _resolution_hours(db: Session, query) -> ResolutionMetric:
+    resolved_count, average = (
+        query.with_entities(func.count(Feedback.id), func.avg(_hours_between(db, Feedback.created_at, Feedback.updated_at)))
+        .filter(Feedback.status == FeedbackStatus.resolved)
+        .one()
+    )
+    if not resolved_count:
         return ResolutionMetric(average_resolution_hours=0.0, resolved_count=0)
     return ResolutionMetric(
-        average_resolution_hours=round(sum(deltas) / len(deltas), 2),
-        resolved_count=len(deltas),
+        average_resolution_hours=round(float(average), 2),
+        resolved_count=resolved_count,
     )
 
 
-def _build_analytics(feedbacks: list[Feedback]) -> AnalyticsResponse:
-    by_type = Counter([item.type.value for item in feedbacks])
-    by_status = Counter([item.status.value for item in feedbacks])
-    by_priority = Counter([item.priority.value for item in feedbacks])
-    top_categories = Counter([item.category for item in feedbacks]).most_common(10)
+def _analytics_etag(query, current_user: User, department: str | None, *extra) -> str:
+    latest, total = query.with_entities(func.max(Feedback.updated_at), func.count(Feedback.id)).one()
+    parts = [latest.isoformat() if latest else "", total, current_user.role.value, current_user.department or "", department or "", *extra]
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": ANALYTICS_CACHE_CONTROL}
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+
+def _build_analytics(db: Session, query) -> AnalyticsResponse:
     return AnalyticsResponse(
-        total_feedback=len(feedbacks),
-        by_type=dict(by_type),
-        by_status=dict(by_status),
-        by_priority=dict(by_priority),
-        top_categories=dict(top_categories),
-        resolution=_resolution_hours(feedbacks),
+        total_feedback=query.with_entities(func.count(Feedback.id)).scalar() or 0,
+        by_type=_grouped_counts(query, Feedback.type),
+        by_status=_grouped_counts(query, Feedback.status),
+        by_priority=_grouped_counts(query, Feedback.priority),
+        top_categories=_grouped_counts(query, Feedback.category, limit=10),
+        resolution=_resolution_hours(db, query),
     )
 
 
+def _analytics_csv_rows(analytics: AnalyticsResponse):
+    yield ["metric", "key", "value"]
+    yield ["total_feedback", "", analytics.total_feedback]
+    for key, value in analytics.by_type.items():
+        yield ["by_type", key, value]
+    for key, value in analytics.by_status.items():
+        yield ["by_status", key, value]
+    for key, value in analytics.by_priority.items():
+        yield ["by_priority", key, value]
+    for key, value in analytics.top_categories.items():
+        yield ["top_category", key, value]
+    yield ["resolution", "average_resolution_hours", analytics.resolution.average_resolution_hours]
+    yield ["resolution", "resolved_count", analytics.resolution.resolved_count]
+
+
+def _iter_csv(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def _pdf_lines(analytics: AnalyticsResponse):
+    # (font, size, x, text, space below)
+    yield "Helvetica-Bold", 14, 40, "PAU Vox Analytics Report", 30
+    yield "Helvetica", 11, 40, f"Generated: {datetime.utcnow().isoformat()} UTC", 30
+    yield "Helvetica", 11, 40, f"Total feedback: {analytics.total_feedback}", 20
+    for label, section in (
+        ("By Type", analytics.by_type),
+        ("By Status", analytics.by_status),
+        ("By Priority", analytics.by_priority),
+        ("Top Categories", analytics.top_categories),
+    ):
+        yield "Helvetica-Bold", 11, 40, label, 18
+        for key, value in section.items():
+            yield "Helvetica", 10, 60, f"{key}: {value}", 14
+    yield "Helvetica", 10, 40, f"Avg resolution (hours): {analytics.resolution.average_resolution_hours}", 14
+    yield "Helvetica", 10, 40, f"Resolved count: {analytics.resolution.resolved_count}", 14
+
+
+def _render_pdf(analytics: AnalyticsResponse) -> BytesIO:
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    y = PDF_TOP
+    text = pdf.beginText()
+    for font, size, x, line, spacing in _pdf_lines(analytics):
+        if y < PDF_BOTTOM:
+            pdf.drawText(text)
+            pdf.showPage()
+            y = PDF_TOP
+            text = pdf.beginText()
+        text.setTextOrigin(x, y)
+        text.setFont(font, size)
+        text.textOut(line)
+        y -= spacing
+    pdf.drawText(text)
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
 @router.get("/", response_model=AnalyticsResponse)
 def get_analytics(
+    request: Request,
+    response: Response,
     department: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> AnalyticsResponse:
+):
     _guard_analytics_access(current_user, department)
-    feedbacks = _filtered_feedback(db, current_user, department)
-    return _build_analytics(feedbacks)
+    query = _scoped_query(db, current_user, department)
+    etag = _analytics_etag(query, current_user, department)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    response.headers.update(_cache_headers(etag))
+    return _build_analytics(db, query)
 
 
 @router.get("/trends")
 def get_trends(
+    request: Request,
+    response: Response,
     days: int = Query(default=30, ge=7, le=365),
     department: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     _guard_analytics_access(current_user, department)
-    feedbacks = _filtered_feedback(db, current_user, department)
-
     end_date = datetime.now(timezone.utc).date()
     start_date = end_date - timedelta(days=days - 1)
+    start_at = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    query = _scoped_query(db, current_user, department)
+    etag = _analytics_etag(query, current_user, department, "trends", days, end_date.isoformat())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    response.headers.update(_cache_headers(etag))
 
-    buckets = defaultdict(lambda: {"date": "", "submitted": 0, "resolved": 0, "avg_resolution_hours": 0.0, "resolution_samples": 0})
-    for idx in range(days):
-        day = start_date + timedelta(days=idx)
-        key = day.isoformat()
-        buckets[key]["date"] = key
-
-    for item in feedbacks:
-        created_day = item.created_at.date().isoformat()
-        if created_day in buckets:
-            buckets[created_day]["submitted"] += 1
-
-        if item.status == FeedbackStatus.resolved:
-            resolved_day = item.updated_at.date().isoformat()
-            if resolved_day in buckets:
-                buckets[resolved_day]["resolved"] += 1
-                delta_hours = (item.updated_at - item.created_at).total_seconds() / 3600
-                buckets[resolved_day]["avg_resolution_hours"] += delta_hours
-                buckets[resolved_day]["resolution_samples"] += 1
-
-    result = []
-    for key in sorted(buckets.keys()):
-        row = buckets[key]
-        if row["resolution_samples"]:
-            row["avg_resolution_hours"] = round(row["avg_resolution_hours"] / row["resolution_samples"], 2)
-        else:
-            row["avg_resolution_hours"] = 0.0
-        row.pop("resolution_samples", None)
-        result.append(row)
+    submitted = [0] * days
+    resolved = [0] * days
+    avg_hours = [0.0] * days
+
+    created_day = _day_bucket(db, Feedback.created_at)
+    submitted_rows = (
+        query.with_entities(created_day, func.count(Feedback.id))
+        .filter(Feedback.created_at >= start_at)
+        .group_by(created_day)
+    )
+    for day, count in submitted_rows:
+        idx = _day_index(day, start_date)
+        if 0 <= idx < days:
+            submitted[idx] = count
+
+    resolved_day = _day_bucket(db, Feedback.updated_at)
+    resolved_rows = (
+        query.with_entities(
+            resolved_day,
+            func.count(Feedback.id),
+            func.avg(_hours_between(db, Feedback.created_at, Feedback.updated_at)),
+        )
+        .filter(Feedback.status == FeedbackStatus.resolved, Feedback.updated_at >= start_at)
+        .group_by(resolved_day)
+    )
+    for day, count, average in resolved_rows:
+        idx = _day_index(day, start_date)
+        if 0 <= idx < days:
+            resolved[idx] = count
+            avg_hours[idx] = round(float(average or 0), 2)
+
+    result = [
+        {
+            "date": (start_date + timedelta(days=idx)).isoformat(),
+            "submitted": submitted[idx],
+            "resolved": resolved[idx],
+            "avg_resolution_hours": avg_hours[idx],
+        }
+        for idx in range(days)
+    ]
 
     return {"items": result, "days": days}
 
 
 @router.get("/export")
 def export_analytics(
+    request: Request,
     format: str = Query(default="csv", pattern="^(csv|pdf)$"),
     department: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     _guard_analytics_access(current_user, department)
-    feedbacks = _filtered_feedback(db, current_user, department)
-    analytics = _build_analytics(feedbacks)
+    query = _scoped_query(db, current_user, department)
+    etag = _analytics_etag(query, current_user, department, "export", format)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    analytics = _build_analytics(db, query)
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
 
     if format == "csv":
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(["metric", "key", "value"])
-        writer.writerow(["total_feedback", "", analytics.total_feedback])
-        for key, value in analytics.by_type.items():
-            writer.writerow(["by_type", key, value])
-        for key, value in analytics.by_status.items():
-            writer.writerow(["by_status", key, value])
-        for key, value in analytics.by_priority.items():
-            writer.writerow(["by_priority", key, value])
-        for key, value in analytics.top_categories.items():
-            writer.writerow(["top_category", key, value])
-        writer.writerow(["resolution", "average_resolution_hours", analytics.resolution.average_resolution_hours])
-        writer.writerow(["resolution", "resolved_count", analytics.resolution.resolved_count])
-        return Response(
-            content=buffer.getvalue(),
+        return StreamingResponse(
+            _iter_csv(_analytics_csv_rows(analytics)),
             media_type="text/csv",
-            headers={"Content-Disposition": f'attachment; filename="analytics_{timestamp}.csv"'},
+            headers={"Content-Disposition": f'attachment; filename="analytics_{timestamp}.csv"', **_cache_headers(etag)},
         )
 
-    pdf_buffer = BytesIO()
-    pdf = canvas.Canvas(pdf_buffer, pagesize=A4)
-    y = 800
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(40, y, "PAU Vox Analytics Report")
-    y -= 30
-    pdf.setFont("Helvetica", 11)
-    pdf.drawString(40, y, f"Generated: {datetime.utcnow().isoformat()} UTC")
-    y -= 30
-    pdf.drawString(40, y, f"Total feedback: {analytics.total_feedback}")
-    y -= 20
-    for label, section in (
-        ("By Type", analytics.by_type),
-        ("By Status", analytics.by_status),
-        ("By Priority", analytics.by_priority),
-        ("Top Categories", analytics.top_categories),
-    ):
-        pdf.setFont("Helvetica-Bold", 11)
-        pdf.drawString(40, y, label)
-        y -= 18
-        pdf.setFont("Helvetica", 10)
-        for key, value in section.items():
-            pdf.drawString(60, y, f"{key}: {value}")
-            y -= 14
-            if y < 80:
-                pdf.showPage()
-                y = 800
-    pdf.drawString(40, y, f"Avg resolution (hours): {analytics.resolution.average_resolution_hours}")
-    y -= 14
-    pdf.drawString(40, y, f"Resolved count: {analytics.resolution.resolved_count}")
-    pdf.save()
-    pdf_buffer.seek(0)
+    pdf_buffer = _render_pdf(analytics)
     return StreamingResponse(
         pdf_buffer,
         media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="analytics_{timestamp}.pdf"'},
+        headers={"Content-Disposition": f'attachment; filename="analytics_{timestamp}.pdf"', **_cache_headers(etag)},
     )
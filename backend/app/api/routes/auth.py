@@ -1,22 +1,34 @@
 from datetime import datetime, timedelta, timezone
-import json
+import hmac
 import logging
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+import time
+from typing import Callable
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
 from app.core.catalog import is_valid_department, normalize_department
 from app.core.config import settings
-from app.core.security import create_access_token, hash_password, verify_password
-from app.db.session import get_db
+from app.core.security import (
+    UNUSABLE_PASSWORD_HASH,
+    create_access_token,
+    hash_password,
+    password_needs_rehash,
+    verify_password,
+)
+from app.db.session import SessionLocal, get_db
 from app.models.account_deletion_request import AccountDeletionRequest
 from app.models.email_verification_code import EmailVerificationCode
-from app.models.enums import AccountDeletionStatus, NotificationType, UserRole
+from app.models.enums import AccountDeletionStatus, FeedbackStatus, NotificationType, UserRole
 from app.models.feedback import Feedback
 from app.models.notification import Notification
 from app.models.survey import SurveyResponse
-from app.models.user import User
+from app.models.user import User, normalize_email
 from app.schemas.account_deletion import AccountDeletionRequestCreate, AccountDeletionRequestOut
 from app.schemas.auth import (
     ChangePasswordRequest,
@@ -32,28 +44,56 @@ from app.schemas.auth import (
     VerifyEmailRequest,
 )
 from app.schemas.common import MessageResponse
-from app.services.email import EmailDeliveryError, generate_verification_code, send_verification_email
+from app.services.cache import USER_LISTS_PREFIX, get_json, incr, invalidate_user_lists, set_json
+from app.services.email import dispatch_verification_email, generate_verification_code, smtp_configured
+from app.services.notifications import insert_notifications
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+EXPORT_BATCH_SIZE = 500
+_PAU_SUFFIX = "@pau.edu.ng"
+_PAU_SUFFIX_LEN = len(_PAU_SUFFIX)
 
 
-def _enforce_pau_domain(email: str) -> None:
-    if not email.lower().endswith("@pau.edu.ng"):
+def _enforce_pau_domain(email: str) -> str:
+    """Return the normalised email, rejecting anything outside the PAU domain."""
+    email = normalize_email(email)
+    if len(email) <= _PAU_SUFFIX_LEN or not email.endswith(_PAU_SUFFIX):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only @pau.edu.ng emails are allowed")
+    return email
+
 
+def _enforce_verification_rate_limit(email: str) -> None:
+    if incr(f"evc:cooldown:{email}", settings.verification_email_cooldown_seconds) > 1:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Please wait before requesting another code")
+    if incr(f"evc:hourly:{email}", 3600) > settings.verification_emails_per_hour:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many verification codes requested")
 
-def _queue_verification_code(db: Session, user: User) -> str:
+
+def _queue_verification_code(db: Session, user: User, now: datetime) -> str:
     code = generate_verification_code()
-    expiry = datetime.now(timezone.utc) + timedelta(minutes=settings.email_verification_code_ttl_minutes)
-    db.add(EmailVerificationCode(user_id=user.id, code=code, expires_at=expiry))
+    expiry = now + timedelta(minutes=settings.email_verification_code_ttl_minutes)
+    db.add(EmailVerificationCode(user_id=user.id, code=code, expires_at=expiry, created_at=now))
     return code
 
 
+def _dispatch_verification_code(db: Session, background_tasks: BackgroundTasks, email: str, code: str) -> bool:
+    if not smtp_configured():
+        if settings.email_delivery_required:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Unable to send verification email")
+        db.commit()
+        return False
+
+    # Commit first so the code exists before the email can arrive.
+    db.commit()
+    background_tasks.add_task(dispatch_verification_email, email, code)
+    return True
+
+
 @router.post("/signup", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> MessageResponse:
-    _enforce_pau_domain(payload.email)
-    email = payload.email.lower()
+def signup(payload: SignupRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> MessageResponse:
+    email = _enforce_pau_domain(payload.email)
     existing = db.query(User).filter(User.email == email).first()
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email is already registered")
@@ -62,6 +102,8 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> MessageResp
     if department and not is_valid_department(department):
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid department")
 
+    _enforce_verification_rate_limit(email)
+    now = datetime.now(timezone.utc)
     user = User(
         email=email,
         full_name=payload.full_name.strip(),
@@ -72,78 +114,72 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> MessageResp
         is_active=True,
         is_major_admin=False,
         role_assignment_locked=False,
+        created_at=now,
     )
 
     db.add(user)
     db.flush()
-    code = _queue_verification_code(db, user)
+    code = _queue_verification_code(db, user, now)
 
-    try:
-        send_verification_email(user.email, code)
-        db.commit()
+    delivered = _dispatch_verification_code(db, background_tasks, email, code)
+    invalidate_user_lists()
+    if delivered:
         return MessageResponse(message="Signup successful. Check your email for the verification code.")
-    except EmailDeliveryError:
-        if settings.email_delivery_required:
-            db.rollback()
-            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Unable to send verification email")
 
-        db.commit()
-        logger.warning("SMTP unavailable in non-production mode. Verification code for %s: %s", user.email, code)
-        return MessageResponse(message="Signup successful. Email delivery unavailable in this environment; verification code is logged on the backend.")
+    logger.warning("SMTP unavailable in non-production mode. Verification code for %s: %s", email, code)
+    return MessageResponse(message="Signup successful. Email delivery unavailable in this environment; verification code is logged on the backend.")
 
 
 @router.post("/verify-email", response_model=MessageResponse)
 def verify_email(payload: VerifyEmailRequest, db: Session = Depends(get_db)) -> MessageResponse:
-    user = db.query(User).filter(User.email == payload.email.lower()).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    code = (
-        db.query(EmailVerificationCode)
-        .filter(
-            EmailVerificationCode.user_id == user.id,
-            EmailVerificationCode.code == payload.code,
-            EmailVerificationCode.used_at.is_(None),
-        )
+    now = datetime.now(timezone.utc)
+    match = (
+        db.query(User, EmailVerificationCode)
+        .join(EmailVerificationCode, EmailVerificationCode.user_id == User.id)
+        .filter(User.email == normalize_email(payload.email), EmailVerificationCode.used_at.is_(None))
         .order_by(EmailVerificationCode.created_at.desc())
         .first()
     )
-    if not code or code.expires_at < datetime.now(timezone.utc):
+    valid = (
+        match is not None
+        and hmac.compare_digest(match[1].code.encode("utf-8"), payload.code.encode("utf-8"))
+        and match[1].expires_at >= now
+    )
+    if not valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired verification code")
 
-    code.used_at = datetime.now(timezone.utc)
+    user, code = match
+    code.used_at = now
     user.is_verified = True
     db.commit()
+    invalidate_user_lists()
     return MessageResponse(message="Email verified successfully.")
 
 
 @router.post("/resend-code", response_model=MessageResponse)
-def resend_code(payload: ResendCodeRequest, db: Session = Depends(get_db)) -> MessageResponse:
-    user = db.query(User).filter(User.email == payload.email.lower()).first()
+def resend_code(payload: ResendCodeRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> MessageResponse:
+    user = db.query(User).filter(User.email == normalize_email(payload.email)).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.is_verified:
         return MessageResponse(message="Email is already verified.")
 
-    code = _queue_verification_code(db, user)
-    try:
-        send_verification_email(user.email, code)
-        db.commit()
+    email = user.email
+    _enforce_verification_rate_limit(email)
+    code = _queue_verification_code(db, user, datetime.now(timezone.utc))
+    if _dispatch_verification_code(db, background_tasks, email, code):
         return MessageResponse(message="Verification code resent.")
-    except EmailDeliveryError:
-        if settings.email_delivery_required:
-            db.rollback()
-            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Unable to send verification email")
 
-        db.commit()
-        logger.warning("SMTP unavailable in non-production mode. Resent verification code for %s: %s", user.email, code)
-        return MessageResponse(message="Verification code regenerated. Email delivery unavailable in this environment; code is logged on the backend.")
+    logger.warning("SMTP unavailable in non-production mode. Resent verification code for %s: %s", email, code)
+    return MessageResponse(message="Verification code regenerated. Email delivery unavailable in this environment; code is logged on the backend.")
 
 
 @router.post("/login", response_model=TokenResponse)
 def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse:
-    user = db.query(User).filter(User.email == payload.email.lower()).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    user = db.query(User).filter(User.email == normalize_email(payload.email)).first()
+    # Unknown emails still pay for one hash check so response time does not reveal which accounts exist.
+    password_ok = verify_password(payload.password, user.hashed_password if user else UNUSABLE_PASSWORD_HASH)
+    if not user or not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     if not user.is_verified:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Email not verified")
@@ -152,47 +188,61 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse
     if user.is_deleted:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is deleted")
 
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = hash_password(payload.password)
+        db.commit()
+
     token = create_access_token(subject=user.id, role=user.role.value)
     return TokenResponse(access_token=token, user=UserPublic.model_validate(user))
 
 
 @router.get("/me", response_model=UserPublic)
-def me(current_user: User = Depends(get_current_user)) -> UserPublic:
+async def me(current_user: User = Depends(get_current_user)) -> UserPublic:
     return UserPublic.model_validate(current_user)
 
 
+def _nth_feedback_timestamp(db: Session, column, position: int, *conditions) -> str | None:
+    value = db.query(column).filter(*conditions).order_by(column.asc()).offset(position - 1).limit(1).scalar()
+    return value.isoformat() if value else None
+
+
 @router.get("/profile", response_model=UserProfile)
 def my_profile(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> UserProfile:
-    feedbacks = (
-        db.query(Feedback)
+    total_feedback, resolved_feedback, pending_feedback = (
+        db.query(
+            func.count(Feedback.id),
+            func.count(Feedback.id).filter(Feedback.status == FeedbackStatus.resolved),
+            func.count(Feedback.id).filter(Feedback.status == FeedbackStatus.pending),
+        )
         .filter(Feedback.student_id == current_user.id)
-        .order_by(Feedback.created_at.asc())
-        .all()
+        .one()
     )
-    resolved_feedbacks = [item for item in feedbacks if item.status.value == "resolved"]
-    pending_feedbacks = [item for item in feedbacks if item.status.value == "pending"]
-
-    total_feedback = len(feedbacks)
-    resolved_feedback = len(resolved_feedbacks)
-    pending_feedback = len(pending_feedbacks)
     resolution_rate = int(round((resolved_feedback / total_feedback) * 100)) if total_feedback > 0 else 0
 
-    first_feedback_date = feedbacks[0].created_at.isoformat() if total_feedback >= 1 else None
-    fifth_resolved_date = (
-        sorted([item.updated_at for item in resolved_feedbacks])[4].isoformat()
-        if resolved_feedback >= 5
-        else None
-    )
-    tenth_feedback_date = feedbacks[9].created_at.isoformat() if total_feedback >= 10 else None
-    third_resolved_date = (
-        sorted([item.updated_at for item in resolved_feedbacks])[2].isoformat()
-        if resolved_feedback >= 3
-        else None
-    )
-    fifth_feedback_date = feedbacks[4].created_at.isoformat() if total_feedback >= 5 else None
+    def nth_created(position: int) -> str | None:
+        if total_feedback < position:
+            return None
+        return _nth_feedback_timestamp(db, Feedback.created_at, position, Feedback.student_id == current_user.id)
+
+    def nth_resolved(position: int) -> str | None:
+        if resolved_feedback < position:
+            return None
+        return _nth_feedback_timestamp(
+            db,
+            Feedback.updated_at,
+            position,
+            Feedback.student_id == current_user.id,
+            Feedback.status == FeedbackStatus.resolved,
+        )
+
+    first_feedback_date = nth_created(1)
+    fifth_resolved_date = nth_resolved(5)
+    tenth_feedback_date = nth_created(10)
+    third_resolved_date = nth_resolved(3)
+    fifth_feedback_date = nth_created(5)
     pau_champion_date = max(filter(None, [fifth_feedback_date, third_resolved_date])) if fifth_feedback_date and third_resolved_date else None
 
     achievements = [
@@ -245,82 +295,87 @@ def my_profile(
     )
 
 
-@router.get("/export-data")
-def export_my_data(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    feedbacks = (
-        db.query(Feedback)
-        .filter(Feedback.student_id == current_user.id)
-        .order_by(Feedback.created_at.desc())
-        .all()
-    )
-    responses = (
-        db.query(SurveyResponse)
-        .filter(SurveyResponse.student_id == current_user.id)
-        .order_by(SurveyResponse.submitted_at.desc())
-        .all()
-    )
-    notifications = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .all()
+def _export_feedback(item: Feedback) -> dict:
+    return {
+        "id": item.id,
+        "type": item.type.value,
+        "category": item.category,
+        "subject": item.subject,
+        "description": item.description,
+        "status": item.status.value,
+        "priority": item.priority.value,
+        "created_at": item.created_at.isoformat(),
+        "updated_at": item.updated_at.isoformat(),
+    }
+
+
+def _export_survey_response(row: SurveyResponse) -> dict:
+    return {
+        "id": row.id,
+        "survey_id": row.survey_id,
+        "is_anonymous": row.is_anonymous,
+        "answers": row.answers,
+        "submitted_at": row.submitted_at.isoformat(),
+    }
+
+
+def _export_notification(row: Notification) -> dict:
+    return {
+        "id": row.id,
+        "feedback_id": row.feedback_id,
+        "title": row.title,
+        "message": row.message,
+        "type": row.type.value,
+        "read": row.read,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def _iter_export(user_payload: dict, user_id: str):
+    # The request-scoped session is closed once the handler returns, so the stream reads through its own.
+    sections = (
+        (
+            "feedback",
+            select(Feedback).where(Feedback.student_id == user_id).order_by(Feedback.created_at.desc()),
+            _export_feedback,
+        ),
+        (
+            "survey_responses",
+            select(SurveyResponse).where(SurveyResponse.student_id == user_id).order_by(SurveyResponse.submitted_at.desc()),
+            _export_survey_response,
+        ),
+        (
+            "notifications",
+            select(Notification).where(Notification.user_id == user_id).order_by(Notification.created_at.desc()),
+            _export_notification,
+        ),
     )
+    with SessionLocal() as db:
+        yield b'{"user":' + orjson.dumps(user_payload)
+        for key, statement, serialize in sections:
+            yield f',"{key}":['.encode("utf-8")
+            separator = b""
+            for row in db.scalars(statement.execution_options(yield_per=EXPORT_BATCH_SIZE)):
+                yield separator + orjson.dumps(serialize(row))
+                separator = b","
+            yield b"]"
+    yield b',"exported_at":' + orjson.dumps(datetime.now(timezone.utc).isoformat()) + b"}"
 
-    payload = {
-        "user": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "full_name": current_user.full_name,
-            "role": current_user.role.value,
-            "department": current_user.department,
-            "is_verified": current_user.is_verified,
-            "is_active": current_user.is_active,
-        },
-        "feedback": [
-            {
-                "id": item.id,
-                "type": item.type.value,
-                "category": item.category,
-                "subject": item.subject,
-                "description": item.description,
-                "status": item.status.value,
-                "priority": item.priority.value,
-                "created_at": item.created_at.isoformat(),
-                "updated_at": item.updated_at.isoformat(),
-            }
-            for item in feedbacks
-        ],
-        "survey_responses": [
-            {
-                "id": row.id,
-                "survey_id": row.survey_id,
-                "is_anonymous": row.is_anonymous,
-                "answers": row.answers,
-                "submitted_at": row.submitted_at.isoformat(),
-            }
-            for row in responses
-        ],
-        "notifications": [
-            {
-                "id": row.id,
-                "feedback_id": row.feedback_id,
-                "title": row.title,
-                "message": row.message,
-                "type": row.type.value,
-                "read": row.read,
-                "created_at": row.created_at.isoformat(),
-            }
-            for row in notifications
-        ],
-        "exported_at": datetime.now(timezone.utc).isoformat(),
+
+@router.get("/export-data")
+def export_my_data(current_user: User = Depends(get_current_user)):
+    user_payload = {
+        "id": current_user.id,
+        "email": current_user.email,
+        "full_name": current_user.full_name,
+        "role": current_user.role.value,
+        "department": current_user.department,
+        "is_verified": current_user.is_verified,
+        "is_active": current_user.is_active,
     }
-    content = json.dumps(payload, indent=2)
-    filename = f"pau-vox-data-{current_user.id[:8]}-{int(datetime.now(timezone.utc).timestamp())}.json"
-    return Response(
-        content=content,
+    filename = f"pau-vox-data-{current_user.id[:8]}-{time.time_ns() // 1_000_000_000}.json"
+    return StreamingResponse(
+        _iter_export(user_payload, current_user.id),
         media_type="application/json",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -352,20 +407,17 @@ def request_account_deletion(
     db.add(request_row)
     db.flush()
 
-    ict_admins = (
-        db.query(User)
-        .filter(User.role == UserRole.ict_admin, User.is_active.is_(True), User.is_deleted.is_(False))
-        .all()
+    admin_ids = db.scalars(
+        select(User.id).where(User.role == UserRole.ict_admin, User.is_active.is_(True), User.is_deleted.is_(False))
+    ).all()
+    message = f"{current_user.full_name} ({current_user.email}) requested account deletion approval."
+    insert_notifications(
+        db,
+        [
+            {"user_id": admin_id, "title": "Account deletion request", "message": message, "type": NotificationType.warning}
+            for admin_id in admin_ids
+        ],
     )
-    for admin in ict_admins:
-        db.add(
-            Notification(
-                user_id=admin.id,
-                title="Account deletion request",
-                message=f"{current_user.full_name} ({current_user.email}) requested account deletion approval.",
-                type=NotificationType.warning,
-            )
-        )
 
     db.commit()
     return MessageResponse(message="Deletion request submitted for ICT Admin approval")
@@ -403,31 +455,38 @@ def change_password(
     return MessageResponse(message="Password updated successfully")
 
 
+def _department_staff(current_user: User) -> list:
+    return [User.role.in_([UserRole.academic_staff, UserRole.course_coordinator]), User.department == current_user.department]
+
+
+STAFF_LIST_ADAPTER = TypeAdapter(list[StaffDirectoryUser])
+
+# Which staff each role may pick from when assigning work.
+STAFF_DIRECTORY_FILTERS: dict[UserRole, Callable[[User], list]] = {
+    UserRole.head_student_affairs: lambda _user: [User.role == UserRole.student_affairs],
+    UserRole.student_affairs: lambda _user: [User.role == UserRole.facilities_management],
+    UserRole.facilities_management: lambda _user: [User.role == UserRole.facilities_account],
+    UserRole.dean: lambda user: [User.role == UserRole.department_head, User.department == user.department],
+    UserRole.department_head: _department_staff,
+    UserRole.course_coordinator: _department_staff,
+}
+
+
 @router.get("/staff-directory", response_model=list[StaffDirectoryUser])
 def staff_directory(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[StaffDirectoryUser]:
-    if current_user.role not in {
-        UserRole.student_affairs,
-        UserRole.head_student_affairs,
-        UserRole.facilities_management,
-        UserRole.department_head,
-        UserRole.course_coordinator,
-        UserRole.dean,
-    }:
+    role_filters = STAFF_DIRECTORY_FILTERS.get(current_user.role)
+    if role_filters is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
-    query = db.query(User).filter(User.is_active.is_(True))
-    if current_user.role == UserRole.head_student_affairs:
-        query = query.filter(User.role == UserRole.student_affairs)
-    elif current_user.role == UserRole.student_affairs:
-        query = query.filter(User.role == UserRole.facilities_management)
-    elif current_user.role == UserRole.facilities_management:
-        query = query.filter(User.role == UserRole.facilities_account)
-    elif current_user.role == UserRole.dean:
-        query = query.filter(User.role == UserRole.department_head, User.department == current_user.department)
-    else:
-        query = query.filter(User.role.in_([UserRole.academic_staff, UserRole.course_coordinator]), User.department == current_user.department)
-    users = query.order_by(User.full_name.asc()).all()
-    return [StaffDirectoryUser.model_validate(user) for user in users]
+    cache_key = f"{USER_LISTS_PREFIX}staff-directory:{current_user.role.value}:{current_user.department or ''}"
+    cached = get_json(cache_key)
+    if cached is not None:
+        return cached
+
+    query = db.query(User).filter(User.is_active.is_(True), *role_filters(current_user))
+    users = STAFF_LIST_ADAPTER.validate_python(query.order_by(User.full_name.asc()).all())
+    set_json(cache_key, STAFF_LIST_ADAPTER.dump_python(users, mode="json"))
+    return users
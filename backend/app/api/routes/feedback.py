@@ -1,21 +1,27 @@
-from datetime import datetime, timezone
+from collections import defaultdict
+from datetime import datetime
+import logging
 from pathlib import Path
 import secrets
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Response, UploadFile, status
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, now_utc
+from app.api.pagination import NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 from app.core.catalog import is_valid_department, normalize_department
 from app.core.config import settings
-from app.core.policies import can_add_internal_note, can_view_feedback
-from app.db.session import get_db
+from app.core.policies import can_add_internal_note, can_modify_feedback_status, can_view_feedback, feedback_scope
+from app.db.session import SessionLocal, get_db
 from app.models.attachment import Attachment
+from app.models.base import db_now
 from app.models.enums import FeedbackPriority, FeedbackStatus, FeedbackType, NotificationType, UserRole
 from app.models.feedback import Feedback
 from app.models.internal_note import InternalNote
-from app.models.notification import Notification
 from app.models.status_history import StatusHistory
 from app.models.user import User
 from app.schemas.common import MessageResponse
@@ -27,24 +33,23 @@ from app.schemas.feedback import (
     FeedbackStatusUpdate,
     FeedbackUpdateByStudent,
     InternalNoteCreate,
+    InternalNoteOut,
+    StatusHistoryOut,
 )
-from app.services.email import send_plain_email
-from app.services.priority import detect_priority
-from app.services.profanity import contains_profanity
+from app.services.email import send_bulk_email
+from app.services.notifications import insert_notifications
 from app.services.similarity import detect_similarity_group
+from app.services.text_pipeline import analyze_text
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 EDIT_WINDOW_SECONDS = 60 * 60
-
-
-def _serialize_feedback(feedback: Feedback, viewer_role: UserRole) -> FeedbackOut:
-    student_name = None if (feedback.is_anonymous and viewer_role != UserRole.student) else feedback.student.full_name
-    description = feedback.description
-    if viewer_role == UserRole.university_management:
-        description = "[REDACTED]"
-
-    include_internal = viewer_role in {
+UPLOAD_CHUNK_BYTES = 64 * 1024
+HIGH_PRIORITIES = {FeedbackPriority.high, FeedbackPriority.urgent}
+# Roles that see internal notes and status history on feedback.
+INTERNAL_ROLES = frozenset(
+    {
         UserRole.academic_staff,
         UserRole.course_coordinator,
         UserRole.dean,
@@ -54,8 +59,74 @@ def _serialize_feedback(feedback: Feedback, viewer_role: UserRole) -> FeedbackOu
         UserRole.facilities_management,
         UserRole.facilities_account,
     }
+)
+# Everything _serialize_feedback reads: many-to-one joined, collections selectin, anything else raises.
+FEEDBACK_LOAD_OPTIONS = (
+    joinedload(Feedback.student),
+    selectinload(Feedback.notes),
+    selectinload(Feedback.status_history),
+    selectinload(Feedback.attachments).load_only(Attachment.id),
+    raiseload("*"),
+)
+# Just what _wants_notification reads, for recipient lookups that only fan out notifications.
+RECIPIENT_COLUMNS = (User.id, User.push_notifications_enabled, User.high_priority_alerts_enabled)
+ASSIGNEE_COLUMNS = (*RECIPIENT_COLUMNS, User.role, User.department)
+
+
+FEEDBACK_LIST_COLUMNS = (
+    Feedback.id,
+    Feedback.type,
+    Feedback.category,
+    Feedback.subject,
+    Feedback.description,
+    Feedback.status,
+    Feedback.priority,
+    Feedback.is_anonymous,
+    Feedback.student_id,
+    Feedback.assigned_to_id,
+    Feedback.assigned_by_id,
+    Feedback.assigned_at,
+    Feedback.due_at,
+    Feedback.department,
+    Feedback.resolution_summary,
+    Feedback.similarity_group,
+    Feedback.created_at,
+    Feedback.updated_at,
+    User.full_name.label("student_full_name"),
+)
+
+
+def _serialize_feedback(feedback: Feedback, viewer_role: UserRole) -> FeedbackOut:
+    # Collections the viewer cannot see are never touched, so callers need not load them.
+    include_internal = viewer_role in INTERNAL_ROLES
+    return _build_feedback_out(
+        feedback,
+        viewer_role,
+        feedback.student.full_name,
+        [item.id for item in feedback.attachments],
+        feedback.notes if include_internal else [],
+        feedback.status_history if include_internal else [],
+    )
+
+
+def _build_feedback_out(
+    feedback,
+    viewer_role: UserRole,
+    student_full_name: str,
+    attachment_ids: list[str],
+    notes: list,
+    status_history: list,
+) -> FeedbackOut:
+    # feedback is either a Feedback instance or a FEEDBACK_LIST_COLUMNS row; both expose the same scalar names.
+    # Callers pass empty notes/status_history for viewers outside INTERNAL_ROLES.
+    student_name = None if (feedback.is_anonymous and viewer_role != UserRole.student) else student_full_name
+    description = feedback.description
+    if viewer_role == UserRole.university_management:
+        description = "[REDACTED]"
+    attachment_prefix = f"/api/v1/feedback/{feedback.id}/attachments/"
 
-    return FeedbackOut(
+    # Every value comes from typed columns, so skip field validation; the route's response_model still checks the output.
+    return FeedbackOut.model_construct(
         id=feedback.id,
         type=feedback.type,
         category=feedback.category,
@@ -73,18 +144,47 @@ def _serialize_feedback(feedback: Feedback, viewer_role: UserRole) -> FeedbackOu
         department=feedback.department,
         resolution_summary=feedback.resolution_summary,
         similarity_group=feedback.similarity_group,
-        attachments=[f"/api/v1/feedback/{feedback.id}/attachments/{item.id}" for item in feedback.attachments],
+        attachments=[attachment_prefix + attachment_id for attachment_id in attachment_ids],
         created_at=feedback.created_at,
         updated_at=feedback.updated_at,
-        notes=feedback.notes if include_internal else [],
-        status_history=feedback.status_history if include_internal else [],
+        notes=[
+            InternalNoteOut.model_construct(id=note.id, author_id=note.author_id, text=note.text, created_at=note.created_at)
+            for note in notes
+        ],
+        status_history=[
+            StatusHistoryOut.model_construct(
+                id=entry.id,
+                status=entry.status,
+                updated_by_id=entry.updated_by_id,
+                note=entry.note,
+                created_at=entry.created_at,
+            )
+            for entry in status_history
+        ],
     )
 
 
-def _record_status_change(db: Session, feedback: Feedback, status_value: FeedbackStatus, by_user_id: str, note: str | None):
+def _get_feedback_full(db: Session, feedback_id: str) -> Feedback | None:
+    return db.execute(select(Feedback).options(*FEEDBACK_LOAD_OPTIONS).where(Feedback.id == feedback_id)).scalar_one_or_none()
+
+
+def _get_active_assignee(db: Session, user_id: str):
+    # Assignment validates role and department and notifies the assignee; nothing else needs a full User.
+    return db.execute(
+        select(*ASSIGNEE_COLUMNS).where(User.id == user_id, User.is_active.is_(True))
+    ).first()
+
+
+def _record_status_change(
+    db: Session, feedback: Feedback, status_value: FeedbackStatus, by_user_id: str, note: str | None, now: datetime
+):
     feedback.status = status_value
-    feedback.updated_at = datetime.now(timezone.utc)
-    db.add(StatusHistory(feedback_id=feedback.id, status=status_value, updated_by_id=by_user_id, note=note))
+    history_row = db.scalars(
+        insert(StatusHistory).returning(StatusHistory),
+        [{"feedback_id": feedback.id, "status": status_value, "updated_by_id": by_user_id, "note": note, "created_at": now}],
+    ).one()
+    # The row is already persisted, so attach it without queuing another write.
+    set_committed_value(feedback, "status_history", [*feedback.status_history, history_row])
 
 
 def _notify(
@@ -95,36 +195,129 @@ def _notify(
     feedback_id: str | None = None,
     level=NotificationType.info,
 ):
-    target_user = db.query(User).filter(User.id == user_id).first()
-    if not target_user or not target_user.push_notifications_enabled:
-        return
-    if level in {NotificationType.warning, NotificationType.error} and not target_user.high_priority_alerts_enabled:
+    _notify_bulk(
+        db, [{"user_id": user_id, "feedback_id": feedback_id, "title": title, "message": message, "type": level}]
+    )
+
+
+def _notify_bulk(db: Session, notifications: list[dict]) -> None:
+    # One preference lookup for every recipient, then one INSERT for the rows they accept.
+    if not notifications:
         return
-    db.add(
-        Notification(
-            user_id=user_id,
-            feedback_id=feedback_id,
-            title=title,
-            message=message,
-            type=level,
-        )
+    recipients = {
+        row.id: row
+        for row in db.query(*RECIPIENT_COLUMNS).filter(User.id.in_({item["user_id"] for item in notifications}))
+    }
+    insert_notifications(
+        db,
+        [
+            item
+            for item in notifications
+            if item["user_id"] in recipients and _wants_notification(recipients[item["user_id"]], item["type"])
+        ],
     )
 
 
-def _can_modify_status(current_user: User, feedback: Feedback) -> bool:
-    role = current_user.role
-    if role in {UserRole.academic_staff, UserRole.department_head, UserRole.course_coordinator, UserRole.dean}:
-        return feedback.type == FeedbackType.academic and feedback.department == current_user.department
-    if role in {UserRole.student_affairs, UserRole.head_student_affairs}:
-        return feedback.type == FeedbackType.non_academic
-    if role in {UserRole.facilities_management, UserRole.facilities_account}:
-        return feedback.type == FeedbackType.non_academic
-    return False
+def _wants_notification(user, level: NotificationType) -> bool:
+    if not user.push_notifications_enabled:
+        return False
+    return level not in {NotificationType.warning, NotificationType.error} or user.high_priority_alerts_enabled
+
+
+def _notify_users(
+    db: Session,
+    recipients: list,
+    title: str,
+    message: str,
+    feedback_id: str | None = None,
+    level=NotificationType.info,
+):
+    insert_notifications(
+        db,
+        [
+            {"user_id": user.id, "feedback_id": feedback_id, "title": title, "message": message, "type": level}
+            for user in recipients
+            if _wants_notification(user, level)
+        ],
+    )
+
+
+def _notify_high_priority(db: Session, feedback) -> None:
+    # feedback is a Feedback instance or a row exposing id, type, department, category and subject.
+    target_role = UserRole.student_affairs if feedback.type == FeedbackType.non_academic else UserRole.department_head
+    staff_query = db.query(*RECIPIENT_COLUMNS).filter(User.role == target_role)
+    if feedback.type == FeedbackType.academic:
+        staff_query = staff_query.filter(User.department == feedback.department)
+    _notify_users(
+        db,
+        staff_query.all(),
+        "High-priority feedback",
+        f"{feedback.category}: {feedback.subject}",
+        feedback.id,
+        NotificationType.warning,
+    )
+
+
+def _assign_similarity_group(feedback_id: str, priority: FeedbackPriority) -> None:
+    # Runs after the 201 is sent; recurring issues may still raise the priority and alert staff.
+    # Works from the stored row and only writes while it still holds the create-time group and
+    # priority, so a student edit that landed first is never overwritten.
+    with SessionLocal() as db:
+        try:
+            feedback = db.execute(
+                select(
+                    Feedback.id,
+                    Feedback.type,
+                    Feedback.category,
+                    Feedback.subject,
+                    Feedback.description,
+                    Feedback.department,
+                ).where(Feedback.id == feedback_id, Feedback.similarity_group.is_(None), Feedback.priority == priority)
+            ).first()
+            if feedback is None:
+                return
+            similarity_group = detect_similarity_group(
+                db=db,
+                feedback_type=feedback.type,
+                category=feedback.category,
+                subject=feedback.subject,
+                description=feedback.description,
+                exclude_id=feedback_id,
+            )
+            if not similarity_group:
+                return
+            recurring_count = (
+                db.query(func.count(Feedback.id))
+                .filter(
+                    Feedback.similarity_group == similarity_group,
+                    Feedback.type == feedback.type,
+                    Feedback.id != feedback_id,
+                )
+                .scalar()
+            )
+            new_priority = priority
+            if recurring_count >= 5:
+                new_priority = FeedbackPriority.urgent
+            elif recurring_count >= 2 and priority in {FeedbackPriority.low, FeedbackPriority.medium}:
+                new_priority = FeedbackPriority.high
+
+            updated = db.execute(
+                update(Feedback)
+                .where(Feedback.id == feedback_id, Feedback.similarity_group.is_(None), Feedback.priority == priority)
+                .values(similarity_group=similarity_group, priority=new_priority)
+            ).rowcount
+            if updated and new_priority in HIGH_PRIORITIES and priority not in HIGH_PRIORITIES:
+                _notify_high_priority(db, feedback)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Similarity grouping failed for feedback %s", feedback_id)
 
 
 @router.post("/", response_model=FeedbackOut, status_code=status.HTTP_201_CREATED)
 def create_feedback(
     payload: FeedbackCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> FeedbackOut:
@@ -137,31 +330,15 @@ def create_feedback(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid department")
     if payload.type == FeedbackType.non_academic:
         department = None
-    if contains_profanity(payload.subject) or contains_profanity(payload.description):
+    # Similarity grouping runs in the background from the stored row, so no tokens are needed here.
+    analysis = analyze_text(payload.subject, payload.description, with_tokens=False)
+    if analysis.profane:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Feedback contains blocked language. Please rewrite before submitting.",
         )
 
-    priority = detect_priority(payload.description)
-    similarity_group = detect_similarity_group(
-        db=db,
-        feedback_type=payload.type,
-        category=payload.category,
-        subject=payload.subject,
-        description=payload.description,
-    )
-    if similarity_group:
-        recurring_count = (
-            db.query(Feedback)
-            .filter(Feedback.similarity_group == similarity_group, Feedback.type == payload.type)
-            .count()
-        )
-        if recurring_count >= 5:
-            priority = FeedbackPriority.urgent
-        elif recurring_count >= 2 and priority in {FeedbackPriority.low, FeedbackPriority.medium}:
-            priority = FeedbackPriority.high
-
+    priority = analysis.priority
     feedback = Feedback(
         type=payload.type,
         category=payload.category,
@@ -171,76 +348,99 @@ def create_feedback(
         department=department,
         student_id=current_user.id,
         priority=priority,
-        similarity_group=similarity_group,
     )
-    db.add(feedback)
-    db.flush()
-    db.add(
+    # Hydrate the relationships the response needs so no reload is required after commit.
+    feedback.student = current_user
+    feedback.notes = []
+    feedback.attachments = []
+    feedback.status_history = [
         StatusHistory(
-            feedback_id=feedback.id,
             status=FeedbackStatus.pending,
             updated_by_id=current_user.id,
             note="Initial submission",
         )
-    )
+    ]
+    db.add(feedback)
+    db.flush()
 
-    if priority in {FeedbackPriority.high, FeedbackPriority.urgent}:
-        target_role = UserRole.student_affairs if payload.type == FeedbackType.non_academic else UserRole.department_head
-        staff_targets = db.query(User).filter(User.role == target_role).all()
-        for staff in staff_targets:
-            if payload.type == FeedbackType.academic and staff.department != payload.department:
-                continue
-            _notify(
-                db,
-                staff.id,
-                "High-priority feedback",
-                f"{payload.category}: {payload.subject}",
-                feedback.id,
-                NotificationType.warning,
-            )
+    if priority in HIGH_PRIORITIES:
+        _notify_high_priority(db, feedback)
 
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback.id)
-        .first()
-    )
-    return _serialize_feedback(feedback, current_user.role)
+    background_tasks.add_task(_assign_similarity_group, feedback.id, priority)
+    return response
 
 
 @router.get("/", response_model=FeedbackListResponse)
 def list_feedback(
+    response: Response,
     feedback_type: FeedbackType | None = Query(default=None),
     status_filter: FeedbackStatus | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=200),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> FeedbackListResponse:
-    if current_user.role in {UserRole.university_management, UserRole.ict_admin}:
+    scope = feedback_scope(current_user)
+    if scope is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Use analytics endpoints for this role")
 
-    query = db.query(Feedback).options(
-        joinedload(Feedback.student),
-        joinedload(Feedback.notes),
-        joinedload(Feedback.status_history),
-        joinedload(Feedback.attachments),
-    )
+    criteria = list(scope)
     if feedback_type:
-        query = query.filter(Feedback.type == feedback_type)
+        criteria.append(Feedback.type == feedback_type)
     if status_filter:
-        query = query.filter(Feedback.status == status_filter)
-
-    if current_user.role == UserRole.student:
-        query = query.filter(Feedback.student_id == current_user.id)
-    elif current_user.role in {UserRole.academic_staff, UserRole.department_head, UserRole.course_coordinator, UserRole.dean}:
-        query = query.filter(Feedback.type == FeedbackType.academic, Feedback.department == current_user.department)
-    elif current_user.role in {UserRole.student_affairs, UserRole.head_student_affairs}:
-        query = query.filter(Feedback.type == FeedbackType.non_academic)
-    elif current_user.role in {UserRole.facilities_management, UserRole.facilities_account}:
-        query = query.filter(Feedback.type == FeedbackType.non_academic)
+        criteria.append(Feedback.status == status_filter)
 
-    items = query.order_by(Feedback.created_at.desc()).all()
-    return FeedbackListResponse(items=[_serialize_feedback(row, current_user.role) for row in items], total=len(items))
+    query = db.query(*FEEDBACK_LIST_COLUMNS).join(Feedback.student).filter(*criteria)
+    rows = apply_keyset(query, Feedback.created_at, Feedback.id, cursor, limit).offset(offset).all()
+    # An unpaged request already holds every row; only a page needs its own COUNT.
+    if limit is None and not offset and not cursor:
+        total = len(rows)
+    else:
+        total = db.query(func.count(Feedback.id)).filter(*criteria).scalar()
+    next_page = next_cursor(rows, limit)
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
+
+    feedback_ids = [row.id for row in rows]
+    attachment_ids = defaultdict(list)
+    notes = defaultdict(list)
+    history = defaultdict(list)
+    if feedback_ids:
+        for feedback_id, attachment_id in (
+            db.query(Attachment.feedback_id, Attachment.id)
+            .filter(Attachment.feedback_id.in_(feedback_ids))
+            .order_by(Attachment.created_at)
+        ):
+            attachment_ids[feedback_id].append(attachment_id)
+        if current_user.role in INTERNAL_ROLES:
+            for note in (
+                db.query(InternalNote.feedback_id, InternalNote.id, InternalNote.author_id, InternalNote.text, InternalNote.created_at)
+                .filter(InternalNote.feedback_id.in_(feedback_ids))
+                .order_by(InternalNote.created_at)
+            ):
+                notes[note.feedback_id].append(note)
+            for entry in (
+                db.query(
+                    StatusHistory.feedback_id,
+                    StatusHistory.id,
+                    StatusHistory.status,
+                    StatusHistory.updated_by_id,
+                    StatusHistory.note,
+                    StatusHistory.created_at,
+                )
+                .filter(StatusHistory.feedback_id.in_(feedback_ids))
+                .order_by(StatusHistory.created_at)
+            ):
+                history[entry.feedback_id].append(entry)
+
+    items = [
+        _build_feedback_out(row, current_user.role, row.student_full_name, attachment_ids[row.id], notes[row.id], history[row.id])
+        for row in rows
+    ]
+    return FeedbackListResponse.model_construct(items=items, total=total)
 
 
 @router.get("/{feedback_id}", response_model=FeedbackOut)
@@ -249,12 +449,7 @@ def get_feedback(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> FeedbackOut:
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
+    feedback = _get_feedback_full(db, feedback_id)
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
     if not can_view_feedback(current_user, feedback):
@@ -268,21 +463,29 @@ def update_feedback_by_student(
     payload: FeedbackUpdateByStudent,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    now: datetime = Depends(now_utc),
 ) -> FeedbackOut:
-    feedback = db.query(Feedback).options(joinedload(Feedback.student), joinedload(Feedback.attachments)).filter(Feedback.id == feedback_id).first()
+    feedback = (
+        db.query(Feedback)
+        .options(joinedload(Feedback.student), selectinload(Feedback.attachments).load_only(Attachment.id), raiseload("*"))
+        .filter(Feedback.id == feedback_id)
+        .first()
+    )
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
     if current_user.role != UserRole.student or feedback.student_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the submitting student can edit this feedback")
 
-    elapsed = datetime.now(timezone.utc) - feedback.created_at
+    elapsed = now - feedback.created_at
     if elapsed.total_seconds() > EDIT_WINDOW_SECONDS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Feedback can only be edited within 1 hour of submission")
 
+    changed = set()
     for field in ("category", "subject", "description", "is_anonymous", "department"):
         value = getattr(payload, field)
-        if value is not None:
+        if value is not None and value != getattr(feedback, field):
             setattr(feedback, field, value)
+            changed.add(field)
 
     feedback.department = normalize_department(feedback.department)
     if feedback.type == FeedbackType.academic:
@@ -293,20 +496,26 @@ def update_feedback_by_student(
     else:
         feedback.department = None
 
-    if contains_profanity(feedback.subject) or contains_profanity(feedback.description):
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Updated text contains blocked language")
-    feedback.priority = detect_priority(feedback.description)
-    feedback.similarity_group = detect_similarity_group(
-        db,
-        feedback.type,
-        feedback.category,
-        feedback.subject,
-        feedback.description,
-    )
-    feedback.updated_at = datetime.now(timezone.utc)
+    if changed & {"category", "subject", "description"}:
+        analysis = analyze_text(feedback.subject, feedback.description)
+        if changed & {"subject", "description"} and analysis.profane:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Updated text contains blocked language")
+        if "description" in changed:
+            feedback.priority = analysis.priority
+        feedback.similarity_group = detect_similarity_group(
+            db,
+            feedback.type,
+            feedback.category,
+            feedback.subject,
+            feedback.description,
+            exclude_id=feedback.id,
+            tokens=analysis.tokens,
+        )
+    feedback.updated_at = db_now()
+    db.flush()
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    db.refresh(feedback)
-    return _serialize_feedback(feedback, current_user.role)
+    return response
 
 
 @router.patch("/{feedback_id}/status", response_model=FeedbackOut)
@@ -315,21 +524,17 @@ def update_feedback_status(
     payload: FeedbackStatusUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    now: datetime = Depends(now_utc),
 ) -> FeedbackOut:
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
+    feedback = _get_feedback_full(db, feedback_id)
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
 
-    if not _can_modify_status(current_user, feedback):
+    if not can_modify_feedback_status(current_user, feedback):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
     if payload.status != feedback.status:
-        _record_status_change(db, feedback, payload.status, current_user.id, payload.note)
+        _record_status_change(db, feedback, payload.status, current_user.id, payload.note, now)
 
     if payload.resolution_summary:
         feedback.resolution_summary = payload.resolution_summary
@@ -342,9 +547,10 @@ def update_feedback_status(
         feedback.id,
         NotificationType.info,
     )
+    db.flush()
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    db.refresh(feedback)
-    return _serialize_feedback(feedback, current_user.role)
+    return response
 
 
 @router.post("/{feedback_id}/assign", response_model=FeedbackOut)
@@ -353,14 +559,10 @@ def assign_feedback(
     payload: FeedbackAssignRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    now: datetime = Depends(now_utc),
 ) -> FeedbackOut:
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
-    assignee = db.query(User).filter(User.id == payload.assignee_id, User.is_active.is_(True)).first()
+    feedback = _get_feedback_full(db, feedback_id)
+    assignee = _get_active_assignee(db, payload.assignee_id)
     if not feedback or not assignee:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback or assignee not found")
     if feedback.status in {FeedbackStatus.resolved, FeedbackStatus.rejected}:
@@ -396,31 +598,42 @@ def assign_feedback(
 
     feedback.assigned_to_id = assignee.id
     feedback.assigned_by_id = current_user.id
-    feedback.assigned_at = datetime.now(timezone.utc)
+    feedback.assigned_at = now
     feedback.due_at = payload.due_at
     feedback.overdue_alert_sent = False
     note_label = "Relegated" if current_user.role == UserRole.dean else "Assigned"
-    _record_status_change(db, feedback, FeedbackStatus.assigned, current_user.id, payload.note or note_label)
-    _notify(
-        db,
-        assignee.id,
-        "New assignment" if current_user.role != UserRole.dean else "New relegated task",
-        f"You have been {'relegated' if current_user.role == UserRole.dean else 'assigned'} feedback '{feedback.subject}'.",
-        feedback.id,
-        NotificationType.warning,
-    )
+    _record_status_change(db, feedback, FeedbackStatus.assigned, current_user.id, payload.note or note_label, now)
+    # Both recipients' preferences are already loaded, so skip _notify's lookup and insert once.
+    notifications = [
+        (
+            assignee,
+            {
+                "user_id": assignee.id,
+                "feedback_id": feedback.id,
+                "title": "New assignment" if current_user.role != UserRole.dean else "New relegated task",
+                "message": f"You have been {'relegated' if current_user.role == UserRole.dean else 'assigned'} feedback '{feedback.subject}'.",
+                "type": NotificationType.warning,
+            },
+        )
+    ]
     if current_user.id != assignee.id:
-        _notify(
-            db,
-            current_user.id,
-            "Assignment confirmed" if current_user.role != UserRole.dean else "Relegation confirmed",
-            f"You {'relegated' if current_user.role == UserRole.dean else 'assigned'} '{feedback.subject}' with due date {payload.due_at.isoformat() if payload.due_at else 'none'}.",
-            feedback.id,
-            NotificationType.info,
+        notifications.append(
+            (
+                current_user,
+                {
+                    "user_id": current_user.id,
+                    "feedback_id": feedback.id,
+                    "title": "Assignment confirmed" if current_user.role != UserRole.dean else "Relegation confirmed",
+                    "message": f"You {'relegated' if current_user.role == UserRole.dean else 'assigned'} '{feedback.subject}' with due date {payload.due_at.isoformat() if payload.due_at else 'none'}.",
+                    "type": NotificationType.info,
+                },
+            )
         )
+    insert_notifications(db, [item for user, item in notifications if _wants_notification(user, item["type"])])
+    db.flush()
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    db.refresh(feedback)
-    return _serialize_feedback(feedback, current_user.role)
+    return response
 
 
 @router.post("/{feedback_id}/notes", response_model=FeedbackOut)
@@ -430,22 +643,18 @@ def add_internal_note(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> FeedbackOut:
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
+    feedback = _get_feedback_full(db, feedback_id)
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
     if not can_add_internal_note(current_user, feedback):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
-    db.add(InternalNote(feedback_id=feedback_id, author_id=current_user.id, text=payload.text))
-    feedback.updated_at = datetime.now(timezone.utc)
+    feedback.notes.append(InternalNote(author_id=current_user.id, text=payload.text))
+    feedback.updated_at = db_now()
+    db.flush()
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    db.refresh(feedback)
-    return _serialize_feedback(feedback, current_user.role)
+    return response
 
 
 @router.post("/{feedback_id}/escalate", response_model=MessageResponse)
@@ -454,40 +663,49 @@ def escalate_feedback(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> MessageResponse:
-    feedback = db.query(Feedback).options(joinedload(Feedback.student)).filter(Feedback.id == feedback_id).first()
+    feedback = (
+        db.query(Feedback.id, Feedback.type, Feedback.department, Feedback.subject)
+        .filter(Feedback.id == feedback_id)
+        .first()
+    )
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
     if current_user.role not in {UserRole.academic_staff, UserRole.student_affairs, UserRole.course_coordinator, UserRole.facilities_management, UserRole.facilities_account}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only operational staff can escalate")
 
     if feedback.type == FeedbackType.academic:
-        recipients = db.query(User).filter(User.role == UserRole.department_head, User.department == feedback.department).all()
-    else:
-        recipients = db.query(User).filter(User.role == UserRole.student_affairs).all()
-    for recipient in recipients:
-        _notify(
-            db,
-            recipient.id,
-            "Escalated feedback",
-            f"Feedback '{feedback.subject}' has been escalated for urgent review.",
-            feedback.id,
-            NotificationType.warning,
+        recipients = (
+            db.query(*RECIPIENT_COLUMNS)
+            .filter(User.role == UserRole.department_head, User.department == feedback.department)
+            .all()
         )
+    else:
+        recipients = db.query(*RECIPIENT_COLUMNS).filter(User.role == UserRole.student_affairs).all()
+    _notify_users(
+        db,
+        recipients,
+        "Escalated feedback",
+        f"Feedback '{feedback.subject}' has been escalated for urgent review.",
+        feedback.id,
+        NotificationType.warning,
+    )
     db.commit()
     return MessageResponse(message="Feedback escalated successfully.")
 
 
 @router.post("/overdue/check", response_model=MessageResponse)
 def check_overdue_assignments(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    now: datetime = Depends(now_utc),
 ) -> MessageResponse:
     if current_user.role not in {UserRole.ict_admin, UserRole.department_head, UserRole.student_affairs, UserRole.course_coordinator, UserRole.head_student_affairs, UserRole.dean, UserRole.facilities_management}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
-    now = datetime.now(timezone.utc)
     overdue_items = (
         db.query(Feedback)
+        .options(joinedload(Feedback.assignee).load_only(User.email, User.email_notifications_enabled), raiseload("*"))
         .filter(
             Feedback.due_at.is_not(None),
             Feedback.due_at < now,
@@ -497,85 +715,104 @@ def check_overdue_assignments(
         .all()
     )
 
+    notifications = []
+    emails = []
     for item in overdue_items:
         if item.assigned_to_id:
-            _notify(
-                db,
-                item.assigned_to_id,
-                "Overdue assignment",
-                f"Task '{item.subject}' is overdue. Please resolve immediately.",
-                item.id,
-                NotificationType.warning,
+            notifications.append(
+                {
+                    "user_id": item.assigned_to_id,
+                    "feedback_id": item.id,
+                    "title": "Overdue assignment",
+                    "message": f"Task '{item.subject}' is overdue. Please resolve immediately.",
+                    "type": NotificationType.warning,
+                }
             )
-            assignee = db.query(User).filter(User.id == item.assigned_to_id).first()
+            assignee = item.assignee
             if assignee and assignee.email_notifications_enabled:
-                send_plain_email(assignee.email, "PAU Vox Overdue Task", f"Task '{item.subject}' is overdue.")
+                emails.append((assignee.email, "PAU Vox Overdue Task", f"Task '{item.subject}' is overdue."))
 
         if item.assigned_by_id:
-            _notify(
-                db,
-                item.assigned_by_id,
-                "Assigned task overdue",
-                f"Task '{item.subject}' assigned by you is overdue.",
-                item.id,
-                NotificationType.warning,
+            notifications.append(
+                {
+                    "user_id": item.assigned_by_id,
+                    "feedback_id": item.id,
+                    "title": "Assigned task overdue",
+                    "message": f"Task '{item.subject}' assigned by you is overdue.",
+                    "type": NotificationType.warning,
+                }
             )
 
         item.overdue_alert_sent = True
 
+    _notify_bulk(db, notifications)
     db.commit()
+    background_tasks.add_task(send_bulk_email, emails)
     return MessageResponse(message=f"Overdue check complete. {len(overdue_items)} task(s) flagged.")
 
 
+def _store_upload(file: UploadFile, storage_path: Path) -> None:
+    # Copy in chunks so memory stays flat and oversized uploads stop at the limit. The copy goes to a
+    # hidden temp name and is renamed into place, so no reader or crash ever sees a partial attachment.
+    temp_path = storage_path.with_name(f".{storage_path.name}.part")
+    written = 0
+    try:
+        with temp_path.open("wb") as target:
+            while chunk := file.file.read(UPLOAD_CHUNK_BYTES):
+                written += len(chunk)
+                if written > settings.max_upload_size_bytes:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Attachment exceeds size limit")
+                target.write(chunk)
+        temp_path.replace(storage_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
 @router.post("/{feedback_id}/attachments", response_model=FeedbackOut)
-async def upload_attachment(
+def upload_attachment(
     feedback_id: str,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    now: datetime = Depends(now_utc),
 ) -> FeedbackOut:
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
+    feedback = _get_feedback_full(db, feedback_id)
     if not feedback:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feedback not found")
 
     can_upload = False
     if current_user.role == UserRole.student:
-        can_upload = feedback.student_id == current_user.id and (datetime.now(timezone.utc) - feedback.created_at).total_seconds() <= EDIT_WINDOW_SECONDS
+        can_upload = feedback.student_id == current_user.id and (now - feedback.created_at).total_seconds() <= EDIT_WINDOW_SECONDS
     elif current_user.role in {UserRole.facilities_management, UserRole.facilities_account, UserRole.student_affairs, UserRole.head_student_affairs, UserRole.department_head, UserRole.dean, UserRole.academic_staff, UserRole.course_coordinator}:
         can_upload = can_view_feedback(current_user, feedback)
     if not can_upload:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
-    content = await file.read()
-    if len(content) > settings.max_upload_size_bytes:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Attachment exceeds size limit")
-
     safe_name = Path(file.filename or "upload.bin").name
     storage_name = f"{feedback_id}_{secrets.token_hex(8)}_{safe_name}"
     storage_path = Path(settings.upload_dir) / storage_name
-    storage_path.write_bytes(content)
+    _store_upload(file, storage_path)
 
     attachment = Attachment(
-        feedback_id=feedback_id,
         uploaded_by_id=current_user.id,
         file_name=safe_name,
         file_path=str(storage_path),
         content_type=file.content_type or "application/octet-stream",
     )
-    db.add(attachment)
+    feedback.attachments.append(attachment)
+    db.flush()
+    response = _serialize_feedback(feedback, current_user.role)
     db.commit()
-    feedback = (
-        db.query(Feedback)
-        .options(joinedload(Feedback.student), joinedload(Feedback.notes), joinedload(Feedback.status_history), joinedload(Feedback.attachments))
-        .filter(Feedback.id == feedback_id)
-        .first()
-    )
-    return _serialize_feedback(feedback, current_user.role)
+    return response
+
+
+def _content_disposition(file_name: str) -> str:
+    # Same encoding FileResponse applies, for responses whose body the proxy supplies.
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
 
 
 @router.get("/{feedback_id}/attachments/{attachment_id}")
@@ -601,4 +838,13 @@ def download_attachment(
     if not Path(attachment.file_path).exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment file missing")
 
+    if settings.upload_accel_redirect_prefix:
+        # The proxy streams the file itself (sendfile), so no bytes pass through the worker.
+        return Response(
+            media_type=attachment.content_type,
+            headers={
+                "X-Accel-Redirect": f"{settings.upload_accel_redirect_prefix.rstrip('/')}/{quote(Path(attachment.file_path).name)}",
+                "Content-Disposition": _content_disposition(attachment.file_name),
+            },
+        )
     return FileResponse(path=attachment.file_path, filename=attachment.file_name, media_type=attachment.content_type)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.api.pagination import NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 from app.db.session import get_db
 from app.models.notification import Notification
 from app.models.user import User
@@ -13,15 +15,17 @@ router = APIRouter()
 
 @router.get("/", response_model=list[NotificationOut])
 def list_notifications(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=200),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[NotificationOut]:
-    rows = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .all()
-    )
+    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    rows = apply_keyset(query, Notification.created_at, Notification.id, cursor, limit).all()
+    next_page = next_cursor(rows, limit)
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     return [NotificationOut.model_validate(row) for row in rows]
 
 
@@ -48,11 +52,13 @@ def mark_all_notifications_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> MessageResponse:
-    rows = db.query(Notification).filter(Notification.user_id == current_user.id, Notification.read.is_(False)).all()
-    for row in rows:
-        row.read = True
+    result = db.execute(
+        update(Notification)
+        .where(Notification.user_id == current_user.id, Notification.read.is_(False))
+        .values(read=True)
+    )
     db.commit()
-    return MessageResponse(message="All notifications marked as read")
+    return MessageResponse(message=f"All notifications marked as read. {result.rowcount} updated.")
 
 
 @router.get("/preferences", response_model=NotificationPreferencesOut)
@@ -78,10 +84,6 @@ def update_notification_preferences(
     current_user.high_priority_alerts_enabled = payload.high_priority_alerts_enabled
     current_user.weekly_digest_enabled = payload.weekly_digest_enabled
     db.commit()
-    db.refresh(current_user)
-    return NotificationPreferencesOut(
-        email_notifications_enabled=current_user.email_notifications_enabled,
-        push_notifications_enabled=current_user.push_notifications_enabled,
-        high_priority_alerts_enabled=current_user.high_priority_alerts_enabled,
-        weekly_digest_enabled=current_user.weekly_digest_enabled,
-    )
+    # The response is exactly what was just written; reading it back off current_user after commit
+    # would reload the whole row.
+    return NotificationPreferencesOut(**payload.model_dump())
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import bindparam, insert, text
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.api.deps import get_current_user
 from app.core.catalog import is_valid_hostel
@@ -54,6 +56,58 @@ def _validated_answers(payload: SurveySubmitRequest, survey: Survey) -> list[dic
     return answers_out
 
 
+# Per survey: response count and the sum of every answer's score, capped at its question's maximum.
+# Answers to question ids outside the survey score nothing; responses without answers still count.
+SCORE_TOTALS_SQL = text(
+    """
+    SELECT r.survey_id,
+           COUNT(DISTINCT r.id) AS response_count,
+           COALESCE(SUM(CASE WHEN q.id IS NOT NULL
+                             THEN LEAST(COALESCE((a.value ->> 'score')::int, 0), q.max_score) END), 0) AS score_total
+    FROM survey_responses r
+    LEFT JOIN LATERAL json_array_elements(r.answers) AS a(value) ON TRUE
+    LEFT JOIN survey_questions q ON q.survey_id = r.survey_id AND q.id = a.value ->> 'question_id'
+    WHERE r.survey_id IN :survey_ids
+    GROUP BY r.survey_id
+    """
+).bindparams(bindparam("survey_ids", expanding=True))
+
+
+def _score_totals(db: Session, surveys: list[Survey]) -> dict[str, tuple[int, int]]:
+    # Maps survey id -> (response_count, score_total); surveys without responses are omitted.
+    if not surveys:
+        return {}
+    survey_ids = [survey.id for survey in surveys]
+    if db.get_bind().dialect.name == "postgresql":
+        return {
+            row.survey_id: (row.response_count, row.score_total)
+            for row in db.execute(SCORE_TOTALS_SQL, {"survey_ids": survey_ids})
+        }
+
+    question_max = {q.id: (q.survey_id, q.max_score) for survey in surveys for q in survey.questions}
+    totals: dict[str, tuple[int, int]] = {}
+    for survey_id, answers in db.query(SurveyResponse.survey_id, SurveyResponse.answers).filter(
+        SurveyResponse.survey_id.in_(survey_ids)
+    ):
+        score_total = 0
+        for item in answers:
+            owner_id, max_score = question_max.get(item.get("question_id"), (None, 0))
+            if owner_id == survey_id:
+                score_total += min(item.get("score", 0), max_score)
+        count, total = totals.get(survey_id, (0, 0))
+        totals[survey_id] = (count + 1, total + score_total)
+    return totals
+
+
+def _score_summary(survey: Survey, response_count: int, score_total: int) -> tuple[float, float]:
+    # Returns (average_percent, star_rating).
+    max_total = sum(q.max_score for q in survey.questions)
+    if not response_count or max_total <= 0:
+        return 0.0, 0.0
+    average_percent = round(score_total / (response_count * max_total) * 100, 2)
+    return average_percent, round((average_percent / 100) * 5, 1)
+
+
 @router.post("/", response_model=SurveyOut, status_code=status.HTTP_201_CREATED)
 def create_survey(
     payload: SurveyCreate,
@@ -79,21 +133,25 @@ def create_survey(
     db.add(survey)
     db.flush()
 
-    for question in payload.questions:
-        db.add(
-            SurveyQuestion(
-                survey_id=survey.id,
-                prompt=question.prompt,
-                max_score=question.max_score,
-                requires_detail=question.requires_detail,
-                detail_label=question.detail_label,
-                position=question.position,
-            )
-        )
-
+    # One multi-row INSERT; RETURNING hands back the rows in payload order for the response.
+    questions = db.scalars(
+        insert(SurveyQuestion).returning(SurveyQuestion, sort_by_parameter_order=True),
+        [
+            {
+                "survey_id": survey.id,
+                "prompt": question.prompt,
+                "max_score": question.max_score,
+                "requires_detail": question.requires_detail,
+                "detail_label": question.detail_label,
+                "position": question.position,
+            }
+            for question in payload.questions
+        ],
+    ).all()
+    set_committed_value(survey, "questions", questions)
+    response = _serialize_survey(survey, current_user)
     db.commit()
-    created = db.query(Survey).options(joinedload(Survey.questions)).filter(Survey.id == survey.id).first()
-    return _serialize_survey(created, current_user)
+    return response
 
 
 @router.get("/", response_model=list[SurveyOut])
@@ -102,7 +160,7 @@ def list_surveys(
     current_user: User = Depends(get_current_user),
 ) -> list[SurveyOut]:
     now = datetime.now(timezone.utc)
-    query = db.query(Survey).options(joinedload(Survey.questions))
+    query = db.query(Survey).options(selectinload(Survey.questions))
 
     if current_user.role == UserRole.student:
         query = query.filter(
@@ -149,7 +207,7 @@ def submit_survey(
     if current_user.role != UserRole.student:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only students can submit survey responses")
 
-    survey = db.query(Survey).options(joinedload(Survey.questions)).filter(Survey.id == survey_id, Survey.is_active.is_(True)).first()
+    survey = db.query(Survey).options(selectinload(Survey.questions)).filter(Survey.id == survey_id, Survey.is_active.is_(True)).first()
     if not survey:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Survey not found")
 
@@ -193,35 +251,16 @@ def survey_results(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> SurveyAggregate:
-    survey = db.query(Survey).options(joinedload(Survey.questions)).filter(Survey.id == survey_id).first()
+    survey = db.query(Survey).options(selectinload(Survey.questions)).filter(Survey.id == survey_id).first()
     if not survey:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Survey not found")
 
     if not _can_view_survey_results(current_user, survey):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
-    responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey_id).all()
-    if not responses:
-        return SurveyAggregate(response_count=0, average_percent=0.0, star_rating=0.0)
-
-    question_max = {q.id: q.max_score for q in survey.questions}
-    max_total = sum(question_max.values())
-    if max_total <= 0:
-        return SurveyAggregate(response_count=len(responses), average_percent=0.0, star_rating=0.0)
-
-    percent_scores: list[float] = []
-    for response in responses:
-        score_total = 0
-        for item in response.answers:
-            qid = item.get("question_id")
-            score = item.get("score", 0)
-            if qid in question_max:
-                score_total += min(score, question_max[qid])
-        percent_scores.append((score_total / max_total) * 100)
-
-    average_percent = round(sum(percent_scores) / len(percent_scores), 2)
-    star_rating = round((average_percent / 100) * 5, 1)
-    return SurveyAggregate(response_count=len(responses), average_percent=average_percent, star_rating=star_rating)
+    response_count, score_total = _score_totals(db, [survey]).get(survey.id, (0, 0))
+    average_percent, star_rating = _score_summary(survey, response_count, score_total)
+    return SurveyAggregate(response_count=response_count, average_percent=average_percent, star_rating=star_rating)
 
 
 @router.get("/{survey_id}/responses", response_model=list[SurveyResponseDetailOut])
@@ -230,7 +269,7 @@ def survey_responses(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[SurveyResponseDetailOut]:
-    survey = db.query(Survey).options(joinedload(Survey.questions)).filter(Survey.id == survey_id).first()
+    survey = db.query(Survey).options(selectinload(Survey.questions)).filter(Survey.id == survey_id).first()
     if not survey:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Survey not found")
     if not _can_view_survey_results(current_user, survey):
@@ -238,15 +277,17 @@ def survey_responses(
 
     question_map = {q.id: q.prompt for q in survey.questions}
     responses = (
-        db.query(SurveyResponse, User.full_name)
-        .join(User, User.id == SurveyResponse.student_id)
+        db.query(SurveyResponse)
         .filter(SurveyResponse.survey_id == survey_id)
         .order_by(SurveyResponse.submitted_at.desc())
         .all()
     )
+    # Only named responses need the users table; a fully anonymous survey never touches it.
+    named_ids = {response.student_id for response in responses if not response.is_anonymous}
+    names = dict(db.query(User.id, User.full_name).filter(User.id.in_(named_ids)).all()) if named_ids else {}
 
     out: list[SurveyResponseDetailOut] = []
-    for response, full_name in responses:
+    for response in responses:
         answer_rows = [
             SurveyResponseAnswerOut(
                 question_id=item.get("question_id"),
@@ -261,7 +302,7 @@ def survey_responses(
                 response_id=response.id,
                 submitted_at=response.submitted_at,
                 anonymous=response.is_anonymous,
-                respondent_name=None if response.is_anonymous else full_name,
+                respondent_name=None if response.is_anonymous else names.get(response.student_id),
                 answers=answer_rows,
             )
         )
@@ -274,51 +315,17 @@ def hostel_ratings(
     current_user: User = Depends(get_current_user),
 ) -> list[HostelRatingOut]:
     _ = current_user
-    surveys = db.query(Survey).options(joinedload(Survey.questions)).filter(Survey.type == SurveyType.hostel).all()
+    surveys = db.query(Survey).options(selectinload(Survey.questions)).filter(Survey.type == SurveyType.hostel).all()
 
+    totals = _score_totals(db, surveys)
     ratings: list[HostelRatingOut] = []
     for survey in surveys:
-        responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey.id).all()
-        if not responses:
-            ratings.append(
-                HostelRatingOut(
-                    hostel=survey.target_hostel or "Unknown",
-                    response_count=0,
-                    average_percent=0.0,
-                    star_rating=0.0,
-                )
-            )
-            continue
-
-        question_max = {q.id: q.max_score for q in survey.questions}
-        max_total = sum(question_max.values())
-        if max_total <= 0:
-            ratings.append(
-                HostelRatingOut(
-                    hostel=survey.target_hostel or "Unknown",
-                    response_count=len(responses),
-                    average_percent=0.0,
-                    star_rating=0.0,
-                )
-            )
-            continue
-
-        percent_scores: list[float] = []
-        for response in responses:
-            total = 0
-            for item in response.answers:
-                qid = item.get("question_id")
-                score = item.get("score", 0)
-                if qid in question_max:
-                    total += min(score, question_max[qid])
-            percent_scores.append((total / max_total) * 100)
-
-        average_percent = round(sum(percent_scores) / len(percent_scores), 2)
-        star_rating = round((average_percent / 100) * 5, 1)
+        response_count, score_total = totals.get(survey.id, (0, 0))
+        average_percent, star_rating = _score_summary(survey, response_count, score_total)
         ratings.append(
             HostelRatingOut(
                 hostel=survey.target_hostel or "Unknown",
-                response_count=len(responses),
+                response_count=response_count,
                 average_percent=average_percent,
                 star_rating=star_rating,
             )
@@ -36,6 +36,10 @@ FEMALE_HOSTELS = [
 
 ALL_HOSTELS = MALE_HOSTELS + FEMALE_HOSTELS
 
+# The lists keep display order; membership checks use these.
+_DEPARTMENT_SET = frozenset(DEPARTMENTS)
+_HOSTEL_SET = frozenset(ALL_HOSTELS)
+
 
 def normalize_department(value: str | None) -> str | None:
     if value is None:
@@ -49,10 +53,10 @@ def normalize_department(value: str | None) -> str | None:
 def is_valid_department(value: str | None) -> bool:
     if value is None:
         return False
-    return value in DEPARTMENTS
+    return value in _DEPARTMENT_SET
 
 
 def is_valid_hostel(value: str | None) -> bool:
     if value is None:
         return False
-    return value in ALL_HOSTELS
+    return value in _HOSTEL_SET
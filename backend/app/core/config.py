@@ -11,6 +11,14 @@ class Settings(BaseSettings):
     secret_key: str = "change-me"
     access_token_expire_minutes: int = 120
     database_url: str = "sqlite:///./pau_vox.db"
+    # Optional PgBouncer (transaction pooling) endpoint; when set the engine connects through it instead.
+    pgbouncer_url: str | None = None
+    # Sync route handlers run in AnyIO's worker threads; keep this at or below the DB pool capacity.
+    threadpool_workers: int = 40
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_timeout_seconds: int = 10
+    db_pool_recycle_seconds: int = 3600
 
     # Accept comma-separated origins in env like: http://localhost:5173,http://localhost:3000
     frontend_origins: Annotated[list[str], NoDecode] = Field(
@@ -19,6 +27,8 @@ class Settings(BaseSettings):
     frontend_origin: str | None = None  # legacy single-origin fallback
 
     email_verification_code_ttl_minutes: int = 15
+    verification_email_cooldown_seconds: int = 60
+    verification_emails_per_hour: int = 5
     smtp_host: str | None = None
     smtp_port: int = 587
     smtp_username: str | None = None
@@ -28,9 +38,17 @@ class Settings(BaseSettings):
     # If unset, production requires delivery and non-production allows fallback.
     require_email_delivery: bool | None = None
 
+    # Shared cache for list endpoints; falls back to an in-process cache when unset.
+    redis_url: str | None = None
+    cache_ttl_seconds: int = 60
+    # Entry cap for the in-process fallback; least recently used keys are evicted past it.
+    memory_cache_max_entries: int = 10000
+
     enforce_https: bool = False
     upload_dir: str = "uploads"
     max_upload_size_bytes: int = 10 * 1024 * 1024
+    # Internal nginx location aliased to upload_dir; when set, downloads are handed off via X-Accel-Redirect.
+    upload_accel_redirect_prefix: str | None = None
 
     # Bootstrap major admin account.
     major_admin_email: str = "owner@pau.edu.ng"
@@ -1,25 +1,71 @@
+from functools import lru_cache
+
 from app.models.enums import FeedbackType, UserRole
 from app.models.feedback import Feedback
 from app.models.user import User
 
+ACADEMIC_SCOPED_ROLES = (UserRole.academic_staff, UserRole.department_head, UserRole.course_coordinator, UserRole.dean)
+NON_ACADEMIC_SCOPED_ROLES = (
+    UserRole.student_affairs,
+    UserRole.head_student_affairs,
+    UserRole.facilities_management,
+    UserRole.facilities_account,
+)
 
-def can_view_feedback(user: User, feedback: Feedback) -> bool:
-    if user.role == UserRole.student:
-        return feedback.student_id == user.id
-    if user.role in {UserRole.academic_staff, UserRole.department_head, UserRole.course_coordinator, UserRole.dean}:
-        return feedback.type == FeedbackType.academic and feedback.department == user.department
-    if user.role in {UserRole.student_affairs, UserRole.head_student_affairs}:
-        return feedback.type == FeedbackType.non_academic
-    if user.role in {UserRole.facilities_management, UserRole.facilities_account}:
-        return feedback.type == FeedbackType.non_academic
-    if user.role in {UserRole.university_management, UserRole.ict_admin}:
-        return False
+
+def _own_feedback_scope(user: User) -> tuple:
+    return (Feedback.student_id == user.id,)
+
+
+def _department_academic_scope(user: User) -> tuple:
+    return (Feedback.type == FeedbackType.academic, Feedback.department == user.department)
+
+
+def _non_academic_scope(user: User) -> tuple:
+    return (Feedback.type == FeedbackType.non_academic,)
+
+
+# SQL criteria for the feedback each role may see; roles without an entry see none.
+FEEDBACK_SCOPES = {
+    UserRole.student: _own_feedback_scope,
+    **{role: _department_academic_scope for role in ACADEMIC_SCOPED_ROLES},
+    **{role: _non_academic_scope for role in NON_ACADEMIC_SCOPED_ROLES},
+}
+
+
+def feedback_scope(user: User) -> tuple | None:
+    scope = FEEDBACK_SCOPES.get(user.role)
+    return None if scope is None else scope(user)
+
+
+# The same rules for a loaded Feedback row; the decision depends only on these few flags.
+@lru_cache(maxsize=None)
+def _can_view(role: UserRole, feedback_type: FeedbackType, is_owner: bool, same_department: bool) -> bool:
+    if role == UserRole.student:
+        return is_owner
+    if role in ACADEMIC_SCOPED_ROLES:
+        return feedback_type == FeedbackType.academic and same_department
+    if role in NON_ACADEMIC_SCOPED_ROLES:
+        return feedback_type == FeedbackType.non_academic
     return False
 
 
-def can_add_internal_note(user: User, feedback: Feedback) -> bool:
-    if user.role in {UserRole.student, UserRole.university_management, UserRole.ict_admin}:
+@lru_cache(maxsize=None)
+def _can_add_note(role: UserRole, feedback_type: FeedbackType, same_department: bool) -> bool:
+    if role in {UserRole.student, UserRole.university_management, UserRole.ict_admin}:
         return False
-    return can_view_feedback(user, feedback) or (
-        user.role == UserRole.student_affairs and feedback.type == FeedbackType.non_academic
+    return _can_view(role, feedback_type, False, same_department) or (
+        role == UserRole.student_affairs and feedback_type == FeedbackType.non_academic
     )
+
+
+def can_view_feedback(user: User, feedback: Feedback) -> bool:
+    return _can_view(user.role, feedback.type, feedback.student_id == user.id, feedback.department == user.department)
+
+
+def can_modify_feedback_status(user: User, feedback: Feedback) -> bool:
+    return user.role != UserRole.student and can_view_feedback(user, feedback)
+
+
+def can_add_internal_note(user: User, feedback: Feedback) -> bool:
+    return _can_add_note(user.role, feedback.type, feedback.department == user.department)
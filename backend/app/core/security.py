@@ -1,21 +1,34 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any
+import secrets
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
 
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+password_hasher = PasswordHasher()
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+# Hash of a discarded random secret: no password verifies against it.
+UNUSABLE_PASSWORD_HASH = hash_password(secrets.token_hex(32))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return password_hasher.check_needs_rehash(hashed_password)
 
 
 def create_access_token(subject: str, role: str, expires_delta: timedelta | None = None) -> str:
@@ -1,14 +1,38 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+engine_url = settings.pgbouncer_url or settings.database_url
+is_sqlite = engine_url.startswith("sqlite")
+connect_args = {"check_same_thread": False} if is_sqlite else {}
+pool_options = (
+    {}
+    if is_sqlite
+    else {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+)
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, connect_args=connect_args)
+engine = create_engine(engine_url, pool_pre_ping=True, connect_args=connect_args, **pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def warm_pool() -> None:
+    if is_sqlite:
+        return
+    connections = [engine.connect() for _ in range(engine.pool.size())]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,15 +1,17 @@
 from pathlib import Path
 from uuid import uuid4
 
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from sqlalchemy import text
 
+from app.api.pagination import NEXT_CURSOR_HEADER
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.security import hash_password
-from app.db.session import engine
+from app.db.session import engine, warm_pool
 from app.models import Base
 from app.models.enums import UserRole
 
@@ -25,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 if settings.enforce_https:
     app.add_middleware(HTTPSRedirectMiddleware)
@@ -111,6 +114,16 @@ def _apply_runtime_patches() -> None:
         "ALTER TABLE users ADD COLUMN IF NOT EXISTS push_notifications_enabled BOOLEAN NOT NULL DEFAULT TRUE",
         "ALTER TABLE users ADD COLUMN IF NOT EXISTS high_priority_alerts_enabled BOOLEAN NOT NULL DEFAULT TRUE",
         "ALTER TABLE users ADD COLUMN IF NOT EXISTS weekly_digest_enabled BOOLEAN NOT NULL DEFAULT FALSE",
+        "CREATE INDEX IF NOT EXISTS ix_evc_user_unused ON email_verification_codes (user_id, created_at DESC) WHERE used_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_adr_status_created ON account_deletion_requests (status, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_users_active_created ON users (created_at DESC) WHERE NOT is_deleted",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_student_status_created ON feedback (student_id, status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_student_status_updated ON feedback (student_id, status, updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_student_created ON feedback (student_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_type_dept_created ON feedback (type, department, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_type_created ON feedback (type, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_simgroup_type ON feedback (similarity_group, type)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_created ON notifications (user_id, created_at DESC)",
     ]
 
     with engine.begin() as conn:
@@ -163,6 +176,12 @@ def on_startup() -> None:
     _apply_runtime_patches()
     _ensure_major_admin()
     Path(settings.upload_dir).mkdir(parents=True, exist_ok=True)
+    warm_pool()
+
+
+@app.on_event("startup")
+async def configure_threadpool() -> None:
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_workers
 
 
 @app.get("/health")
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from uuid import uuid4
 
-from sqlalchemy import DateTime, Enum, String, Text
+from sqlalchemy import DateTime, Enum, Index, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -10,6 +10,7 @@ from app.models.enums import AccountDeletionStatus
 
 class AccountDeletionRequest(Base):
     __tablename__ = "account_deletion_requests"
+    __table_args__ = (Index("ix_adr_status_created", "status", text("created_at DESC")),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     requester_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
@@ -1,5 +1,32 @@
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql.functions import FunctionElement
 
 
 class Base(DeclarativeBase):
     pass
+
+
+# Database clock at the start of the current statement. Postgres' now() is frozen at transaction
+# start, which can predate app-side work earlier in the same request; statement_timestamp() is not.
+class db_now(FunctionElement):
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(db_now)
+def _compile_db_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(db_now, "sqlite")
+def _compile_db_now_sqlite(element, compiler, **kw):
+    # SQLite stores datetimes as text; match SQLAlchemy's own "YYYY-MM-DD HH:MM:SS.ffffff" format so
+    # stamped values compare correctly against bound datetimes (keyset cursors, range filters).
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(db_now, "postgresql")
+def _compile_db_now_postgresql(element, compiler, **kw):
+    return "statement_timestamp()"
@@ -1,15 +1,24 @@
-from datetime import datetime, timezone
+from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, String, Text
+from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Index, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import Base
+from app.models.base import Base, db_now
 from app.models.enums import FeedbackPriority, FeedbackStatus, FeedbackType
 
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_feedback_student_status_created", "student_id", "status", "created_at"),
+        Index("ix_feedback_student_status_updated", "student_id", "status", "updated_at"),
+        Index("ix_feedback_student_created", "student_id", text("created_at DESC")),
+        Index("ix_feedback_type_dept_created", "type", "department", text("created_at DESC")),
+        Index("ix_feedback_type_created", "type", text("created_at DESC")),
+        Index("ix_feedback_simgroup_type", "similarity_group", "type"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     type: Mapped[FeedbackType] = mapped_column(Enum(FeedbackType), nullable=False, index=True)
@@ -32,10 +41,10 @@ class Feedback(Base):
     assigned_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     due_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
     overdue_alert_sent: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
-    )
+    # Both stamps come from the database clock so durations never mix app and DB time;
+    # eager_defaults reads them back via RETURNING on flush.
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=db_now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=db_now(), onupdate=db_now())
 
     student = relationship("User", back_populates="submitted_feedback", foreign_keys=[student_id])
     assignee = relationship("User", back_populates="assigned_feedback", foreign_keys=[assigned_to_id])
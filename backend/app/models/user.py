@@ -1,15 +1,27 @@
 from datetime import datetime, timezone
 from uuid import uuid4
 
-from sqlalchemy import Boolean, DateTime, Enum, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Boolean, DateTime, Enum, Index, String, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 from app.models.enums import UserRole
 
 
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index(
+            "ix_users_active_created",
+            text("created_at DESC"),
+            postgresql_where=text("NOT is_deleted"),
+            sqlite_where=text("NOT is_deleted"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
@@ -31,3 +43,7 @@ class User(Base):
     submitted_feedback = relationship("Feedback", back_populates="student", foreign_keys="Feedback.student_id")
     assigned_feedback = relationship("Feedback", back_populates="assignee", foreign_keys="Feedback.assigned_to_id")
     notifications = relationship("Notification", back_populates="user")
+
+    @validates("email")
+    def _normalize_email(self, _key: str, value: str) -> str:
+        return normalize_email(value)
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_LISTS_PREFIX = "users:"
+
+
+class _MemoryCache:
+    # Bounded LRU: keys written once and never read again (rate-limit counters, one-off lookups)
+    # are evicted instead of accumulating for the life of the process.
+    def __init__(self, max_entries: int) -> None:
+        self._items: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _store(self, key: str, expires_at: float, value: str) -> None:
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._store(key, time.monotonic() + ttl_seconds, value)
+
+    def incr(self, key: str, ttl_seconds: int) -> int:
+        with self._lock:
+            now = time.monotonic()
+            item = self._items.get(key)
+            if item is None or item[0] < now:
+                count, expires_at = 1, now + ttl_seconds
+            else:
+                count, expires_at = int(item[1]) + 1, item[0]
+            self._store(key, expires_at, str(count))
+            return count
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._items if key.startswith(prefix)]:
+                del self._items[key]
+
+
+class _RedisCache:
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> str | None:
+        try:
+            return self._client.get(key)
+        except self._errors:
+            logger.warning("Redis GET failed for %s", key, exc_info=True)
+            return None
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        try:
+            self._client.set(key, value, ex=ttl_seconds)
+        except self._errors:
+            logger.warning("Redis SET failed for %s", key, exc_info=True)
+
+    def incr(self, key: str, ttl_seconds: int) -> int:
+        try:
+            count = self._client.incr(key)
+            if count == 1:
+                self._client.expire(key, ttl_seconds)
+            return count
+        except self._errors:
+            logger.warning("Redis INCR failed for %s", key, exc_info=True)
+            return 0
+
+    def delete_prefix(self, prefix: str) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=f"{prefix}*"))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            logger.warning("Redis invalidation failed for %s", prefix, exc_info=True)
+
+
+_backend = _RedisCache(settings.redis_url) if settings.redis_url else _MemoryCache(settings.memory_cache_max_entries)
+
+
+def get_json(key: str) -> Any | None:
+    raw = _backend.get(key)
+    return None if raw is None else json.loads(raw)
+
+
+def set_json(key: str, value: Any, ttl_seconds: int | None = None) -> None:
+    _backend.set(key, json.dumps(value), ttl_seconds or settings.cache_ttl_seconds)
+
+
+def incr(key: str, ttl_seconds: int) -> int:
+    """Increment a counter that expires ttl_seconds after its first hit; 0 if the backend is unavailable."""
+    return _backend.incr(key, ttl_seconds)
+
+
+def delete_prefix(prefix: str) -> None:
+    _backend.delete_prefix(prefix)
+
+
+def invalidate_user_lists() -> None:
+    delete_prefix(USER_LISTS_PREFIX)
@@ -17,22 +17,39 @@ def generate_verification_code() -> str:
     return "".join(random.choices(string.digits, k=6))
 
 
-def _deliver_email(recipient: str, subject: str, body: str) -> None:
-    if not settings.smtp_host or not settings.smtp_from_email:
-        raise EmailDeliveryError("SMTP is not configured. Set SMTP_HOST and SMTP_FROM_EMAIL.")
+def smtp_configured() -> bool:
+    return bool(settings.smtp_host and settings.smtp_from_email)
 
+
+def _build_message(recipient: str, subject: str, body: str) -> EmailMessage:
     message = EmailMessage()
     message["Subject"] = subject
     message["From"] = settings.smtp_from_email
     message["To"] = recipient
     message.set_content(body)
+    return message
+
+
+def _open_smtp() -> smtplib.SMTP:
+    server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=20)
+    try:
+        if settings.smtp_use_tls:
+            server.starttls()
+        if settings.smtp_username and settings.smtp_password:
+            server.login(settings.smtp_username, settings.smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def _deliver_email(recipient: str, subject: str, body: str) -> None:
+    if not smtp_configured():
+        raise EmailDeliveryError("SMTP is not configured. Set SMTP_HOST and SMTP_FROM_EMAIL.")
 
+    message = _build_message(recipient, subject, body)
     try:
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=20) as server:
-            if settings.smtp_use_tls:
-                server.starttls()
-            if settings.smtp_username and settings.smtp_password:
-                server.login(settings.smtp_username, settings.smtp_password)
+        with _open_smtp() as server:
             server.send_message(message)
     except Exception as exc:
         logger.exception("Failed to send email to %s", recipient)
@@ -48,5 +65,31 @@ def send_verification_email(recipient: str, code: str) -> None:
     )
 
 
+def dispatch_verification_email(recipient: str, code: str) -> None:
+    # Runs as a background task after the response is sent, so failures are only logged.
+    try:
+        send_verification_email(recipient, code)
+    except EmailDeliveryError:
+        logger.warning("Verification email to %s was not delivered", recipient)
+
+
 def send_plain_email(recipient: str, subject: str, body: str) -> None:
     _deliver_email(recipient, subject, body)
+
+
+def send_bulk_email(messages: list[tuple[str, str, str]]) -> None:
+    # Background task: sends (recipient, subject, body) tuples over one SMTP session and only logs failures.
+    if not messages:
+        return
+    if not smtp_configured():
+        logger.warning("SMTP is not configured; dropping %d email(s)", len(messages))
+        return
+    try:
+        with _open_smtp() as server:
+            for recipient, subject, body in messages:
+                try:
+                    server.send_message(_build_message(recipient, subject, body))
+                except smtplib.SMTPException:
+                    logger.exception("Failed to send email to %s", recipient)
+    except Exception:
+        logger.exception("Failed to open SMTP session for %d email(s)", len(messages))
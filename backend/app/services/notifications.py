@@ -0,0 +1,12 @@
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.notification import Notification
+
+
+def insert_notifications(db: Session, rows: list[dict[str, Any]]) -> None:
+    # One executemany INSERT instead of an ORM add() per notification.
+    if rows:
+        db.execute(insert(Notification), rows)
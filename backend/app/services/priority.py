@@ -5,7 +5,10 @@ HIGH_KEYWORDS = {"broken", "not working", "critical", "severe", "serious"}
 
 
 def detect_priority(text: str) -> FeedbackPriority:
-    lower = text.lower()
+    return priority_for_lower(text.lower())
+
+
+def priority_for_lower(lower: str) -> FeedbackPriority:
     if any(keyword in lower for keyword in URGENT_KEYWORDS):
         return FeedbackPriority.urgent
     if any(keyword in lower for keyword in HIGH_KEYWORDS):
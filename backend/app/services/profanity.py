@@ -1,3 +1,4 @@
+import re
 from typing import Iterable
 
 BLOCKED_WORDS = {
@@ -10,7 +11,18 @@ BLOCKED_WORDS = {
     "suck",
 }
 
+# Substring match, like the original `word in text` scan, but one regex pass per text.
+_BLOCKED_PATTERN = re.compile("|".join(re.escape(word) for word in sorted(BLOCKED_WORDS, key=len, reverse=True)))
+
 
 def contains_profanity(text: str, blocked_words: Iterable[str] = BLOCKED_WORDS) -> bool:
     lower = text.lower()
+    if blocked_words is BLOCKED_WORDS:
+        return _BLOCKED_PATTERN.search(lower) is not None
     return any(word in lower for word in blocked_words)
+
+
+def contains_blocked_word(lower: str) -> bool:
+    # For callers that already hold the lowercased text.
+    return _BLOCKED_PATTERN.search(lower) is not None
+
@@ -14,6 +14,11 @@ def _tokens(value: str) -> set[str]:
     return set(TOKEN_RE.findall(value.lower()))
 
 
+def similarity_tokens(lower: str) -> set[str]:
+    # TOKEN_RE only matches alphanumerics, so any separator between subject and description tokenizes the same.
+    return set(TOKEN_RE.findall(lower))
+
+
 def _jaccard(a: set[str], b: set[str]) -> float:
     if not a or not b:
         return 0.0
@@ -26,17 +31,18 @@ def detect_similarity_group(
     category: str,
     subject: str,
     description: str,
+    exclude_id: str | None = None,
+    tokens: set[str] | None = None,
 ) -> str | None:
-    incoming_tokens = _tokens(f"{subject} {description}")
-    candidates = (
-        db.query(Feedback)
-        .filter(Feedback.type == feedback_type, Feedback.category == category)
-        .order_by(Feedback.created_at.desc())
-        .limit(100)
-        .all()
+    incoming_tokens = tokens if tokens is not None else _tokens(f"{subject} {description}")
+    query = db.query(Feedback.id, Feedback.subject, Feedback.description, Feedback.similarity_group).filter(
+        Feedback.type == feedback_type, Feedback.category == category
     )
+    if exclude_id:
+        query = query.filter(Feedback.id != exclude_id)
+    candidates = query.order_by(Feedback.created_at.desc()).limit(100).all()
 
-    best_match: Feedback | None = None
+    best_match = None
     best_score = 0.0
     for candidate in candidates:
         score = _jaccard(incoming_tokens, _tokens(f"{candidate.subject} {candidate.description}"))
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+
+from app.models.enums import FeedbackPriority
+from app.services.priority import priority_for_lower
+from app.services.profanity import contains_blocked_word
+from app.services.similarity import similarity_tokens
+
+
+@dataclass(frozen=True)
+class TextAnalysis:
+    profane: bool
+    priority: FeedbackPriority
+    tokens: set[str] | None
+
+
+def analyze_text(subject: str, description: str, with_tokens: bool = True) -> TextAnalysis:
+    # Lowercase once and feed the same strings to the profanity, priority and similarity checks.
+    # Callers that group later from the stored row pass with_tokens=False to skip tokenizing.
+    lower_subject = subject.lower()
+    lower_description = description.lower()
+    # NUL never appears in a blocked word, so profanity matches cannot straddle subject and description.
+    combined = f"{lower_subject}\x00{lower_description}"
+    return TextAnalysis(
+        profane=contains_blocked_word(combined),
+        priority=priority_for_lower(lower_description),
+        tokens=similarity_tokens(combined) if with_tokens else None,
+    )